@@ -1,21 +1,44 @@
 # backend/server.py
 
-from fastapi import FastAPI, APIRouter, HTTPException, Depends, UploadFile, File, Form, Request
+from fastapi import FastAPI, APIRouter, HTTPException, Depends, UploadFile, File, Form, Request, Query, Response
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from fastapi.staticfiles import StaticFiles
+from fastapi.responses import StreamingResponse
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import IndexModel, InsertOne, UpdateOne, ReplaceOne, ReturnDocument, ASCENDING, DESCENDING
+from pymongo.errors import BulkWriteError, DuplicateKeyError
 import os
 import logging
 from pathlib import Path
 from pydantic import BaseModel, Field
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Tuple
 import uuid
+import asyncio
+import time
+import hashlib
+import base64
+import json
+import csv
+import io
+import zlib
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 from datetime import datetime, timedelta
 from supabase import create_client, Client
+import jwt
+import requests
 import shutil
 import aiofiles
+import bson
+from bson.binary import Binary
+
+try:
+    import zstandard
+except ImportError:  # Optional: attendance archives fall back to zlib
+    zstandard = None
 
 # ---- Add your class AFTER imports ----
 class RefreshRequest(BaseModel):
@@ -46,6 +69,159 @@ client = AsyncIOMotorClient(
 )
 db = client[os.environ['DB_NAME']]
 
+# MongoDB index registry: every query shape the API issues, per collection.
+# Applied idempotently at startup (ENSURE_INDEXES_ON_STARTUP) and by the
+# `ensure-indexes` / `index-report` maintenance commands.
+INDEX_REGISTRY: Dict[str, List[IndexModel]] = {
+    "academies": [
+        IndexModel([("id", ASCENDING)], name="id_unique", unique=True),
+        IndexModel([("supabase_user_id", ASCENDING)], name="supabase_user_id"),
+        IndexModel([("created_at", ASCENDING), ("id", ASCENDING)], name="created_at_id"),
+        IndexModel([("status", ASCENDING), ("created_at", ASCENDING), ("id", ASCENDING)], name="status_created_at_id"),
+    ],
+    "players": [
+        IndexModel([("id", ASCENDING)], name="id_unique", unique=True),
+        IndexModel([("academy_id", ASCENDING), ("status", ASCENDING)], name="academy_status"),
+        IndexModel([("academy_id", ASCENDING), ("created_at", ASCENDING), ("id", ASCENDING)], name="academy_created_at_id"),
+        IndexModel(
+            [("academy_id", ASCENDING), ("status", ASCENDING), ("created_at", ASCENDING), ("id", ASCENDING)],
+            name="academy_status_created_at_id"
+        ),
+        IndexModel([("supabase_user_id", ASCENDING)], name="supabase_user_id", sparse=True),
+        # Registration numbers are unique among an academy's active players
+        IndexModel(
+            [("academy_id", ASCENDING), ("registration_number", ASCENDING)],
+            name="academy_registration_number_active_unique",
+            unique=True,
+            partialFilterExpression={"status": "active", "registration_number": {"$gt": ""}}
+        ),
+    ],
+    "coaches": [
+        IndexModel([("id", ASCENDING)], name="id_unique", unique=True),
+        IndexModel([("academy_id", ASCENDING), ("status", ASCENDING)], name="academy_status"),
+        IndexModel([("academy_id", ASCENDING), ("created_at", ASCENDING), ("id", ASCENDING)], name="academy_created_at_id"),
+    ],
+    "player_attendance": [
+        IndexModel([("id", ASCENDING)], name="id_unique", unique=True),
+        IndexModel(
+            [("player_id", ASCENDING), ("academy_id", ASCENDING), ("date", ASCENDING)],
+            name="player_academy_date_unique",
+            unique=True
+        ),
+        # Also serves the export's (date, player_id) sort; academy_id/date range reads use its prefix
+        IndexModel(
+            [("academy_id", ASCENDING), ("date", ASCENDING), ("player_id", ASCENDING)],
+            name="academy_date_player"
+        ),
+        IndexModel([("player_id", ASCENDING), ("date", DESCENDING)], name="player_date_desc"),
+    ],
+    "attendance_buckets": [
+        IndexModel(
+            [("academy_id", ASCENDING), ("player_id", ASCENDING), ("month", ASCENDING)],
+            name="academy_player_month_unique",
+            unique=True
+        ),
+        IndexModel([("academy_id", ASCENDING), ("month", ASCENDING)], name="academy_month"),
+        IndexModel([("player_id", ASCENDING), ("month", DESCENDING)], name="player_month_desc"),
+    ],
+    "attendance_archive": [
+        IndexModel(
+            [("academy_id", ASCENDING), ("player_id", ASCENDING), ("month", ASCENDING)],
+            name="academy_player_month_unique",
+            unique=True
+        ),
+        IndexModel([("academy_id", ASCENDING), ("month", ASCENDING)], name="academy_month"),
+        IndexModel([("player_id", ASCENDING), ("month", ASCENDING)], name="player_month"),
+    ],
+    "announcements": [
+        IndexModel([("id", ASCENDING)], name="id_unique", unique=True),
+        IndexModel(
+            [("academy_id", ASCENDING), ("is_active", ASCENDING), ("target_audience", ASCENDING), ("created_at", DESCENDING)],
+            name="academy_active_audience_created_at"
+        ),
+        IndexModel([("academy_id", ASCENDING), ("created_at", DESCENDING), ("id", DESCENDING)], name="academy_created_at_id"),
+    ],
+    "player_stats": [
+        IndexModel([("player_id", ASCENDING)], name="player_id_unique", unique=True),
+        IndexModel([("academy_id", ASCENDING)], name="academy_id"),
+    ],
+    "attendance_monthly": [
+        IndexModel(
+            [("academy_id", ASCENDING), ("month", ASCENDING), ("player_id", ASCENDING)],
+            name="academy_month_player_unique",
+            unique=True
+        ),
+    ],
+    "academy_counters": [
+        IndexModel([("academy_id", ASCENDING)], name="academy_id_unique", unique=True),
+    ],
+    "academy_data_versions": [
+        IndexModel([("academy_id", ASCENDING)], name="academy_id_unique", unique=True),
+    ],
+    "activity_log": [
+        IndexModel([("timestamp", DESCENDING)], name="timestamp_desc"),
+    ],
+    "deletion_jobs": [
+        IndexModel([("id", ASCENDING)], name="id_unique", unique=True),
+        IndexModel([("status", ASCENDING), ("created_at", ASCENDING)], name="status_created_at"),
+    ],
+    "academy_settings": [
+        IndexModel([("academy_id", ASCENDING)], name="academy_id_unique", unique=True),
+    ],
+    "academy_subscriptions": [
+        # Partial: subscriptions upserted by older admin updates have no id
+        IndexModel([("id", ASCENDING)], name="id_unique", unique=True, partialFilterExpression={"id": {"$type": "string"}}),
+        IndexModel([("academy_id", ASCENDING)], name="academy_id_unique", unique=True),
+        IndexModel([("created_at", ASCENDING), ("id", ASCENDING)], name="created_at_id"),
+    ],
+    "payment_transactions": [
+        IndexModel([("id", ASCENDING)], name="id_unique", unique=True),
+        IndexModel([("academy_id", ASCENDING), ("created_at", DESCENDING), ("id", DESCENDING)], name="academy_created_at_id"),
+        IndexModel([("created_at", DESCENDING), ("id", DESCENDING)], name="created_at_id"),
+    ],
+    "demo_requests": [
+        IndexModel([("id", ASCENDING)], name="id_unique", unique=True),
+        IndexModel([("status", ASCENDING), ("created_at", DESCENDING), ("id", DESCENDING)], name="status_created_at_id"),
+        IndexModel([("created_at", DESCENDING), ("id", DESCENDING)], name="created_at_id"),
+    ],
+    "status_checks": [
+        IndexModel([("timestamp", ASCENDING), ("id", ASCENDING)], name="timestamp_id"),
+    ],
+}
+
+async def ensure_indexes() -> List[str]:
+    """Create every registered index; returns the names of indexes that failed"""
+    # Capped collections must exist before an index build would create them implicitly
+    await ensure_activity_log()
+    failed = []
+    for collection_name, indexes in INDEX_REGISTRY.items():
+        for index in indexes:
+            # One index per call so a conflict (e.g. duplicate data under a
+            # unique index) does not block the rest of the collection
+            try:
+                await db[collection_name].create_indexes([index])
+            except Exception as e:
+                index_name = f"{collection_name}.{index.document['name']}"
+                logger.error(f"Failed to create index {index_name}: {e}")
+                failed.append(index_name)
+    return failed
+
+async def build_index_report() -> Dict[str, Dict[str, List[str]]]:
+    """Compare registered indexes against the database and $indexStats usage"""
+    report = {}
+    for collection_name, indexes in INDEX_REGISTRY.items():
+        declared = {index.document["name"] for index in indexes}
+        existing = set(await db[collection_name].index_information())
+        usage = {}
+        async for index_stats in db[collection_name].aggregate([{"$indexStats": {}}]):
+            usage[index_stats["name"]] = index_stats["accesses"]["ops"]
+        report[collection_name] = {
+            "missing": sorted(declared - existing),
+            "unused": sorted(name for name, ops in usage.items() if ops == 0 and name != "_id_"),
+            "undeclared": sorted(existing - declared - {"_id_"}),
+        }
+    return report
+
 # Supabase connection
 supabase_url = os.environ.get('SUPABASE_URL')
 supabase_key = os.environ.get('SUPABASE_KEY')
@@ -58,6 +234,32 @@ if not all([supabase_url, supabase_key, supabase_service_key]):
 supabase: Client = create_client(supabase_url, supabase_key)
 supabase_admin: Client = create_client(supabase_url, supabase_service_key)
 
+class SupabaseGateway:
+    """Runs blocking supabase-py calls on a bounded thread pool, off the event loop"""
+
+    def __init__(self, max_concurrency: int, timeout_seconds: float):
+        self.timeout_seconds = timeout_seconds
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="supabase")
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def call(self, fn, *args, timeout: Optional[float] = None, **kwargs):
+        """Await fn(*args, **kwargs); raises asyncio.TimeoutError after the per-call timeout"""
+        loop = asyncio.get_running_loop()
+        async with self._semaphore:
+            return await asyncio.wait_for(
+                loop.run_in_executor(self._executor, partial(fn, *args, **kwargs)),
+                timeout=timeout or self.timeout_seconds
+            )
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False)
+
+# Every Supabase interaction goes through the gateway
+supabase_gateway = SupabaseGateway(
+    max_concurrency=int(os.getenv("SUPABASE_MAX_CONCURRENCY", "16")),
+    timeout_seconds=float(os.getenv("SUPABASE_CALL_TIMEOUT_SECONDS", "10"))
+)
+
 # Stripe configuration - REMOVED for manual billing
 # stripe_api_key = os.environ.get('STRIPE_API_KEY')
 # if not stripe_api_key:
@@ -67,6 +269,81 @@ stripe_api_key = None  # Disabled for manual billing
 # Security
 security = HTTPBearer(auto_error=False)
 
+# Access token verification
+# "local" validates Supabase JWTs in-process against a cached signing key,
+# "remote" forces a GoTrue round trip (supabase.auth.get_user) for every token.
+AUTH_VERIFY_MODE = os.getenv("AUTH_VERIFY_MODE", "local").lower()
+supabase_jwt_secret = os.environ.get('SUPABASE_JWT_SECRET')  # HS256 projects
+SUPABASE_JWT_AUDIENCE = os.getenv("SUPABASE_JWT_AUDIENCE", "authenticated")
+SUPABASE_JWKS_URL = f"{supabase_url}/auth/v1/.well-known/jwks.json"
+SUPABASE_JWKS_TTL_SECONDS = int(os.getenv("SUPABASE_JWKS_TTL_SECONDS", "600"))
+SUPABASE_JWKS_MIN_REFRESH_SECONDS = int(os.getenv("SUPABASE_JWKS_MIN_REFRESH_SECONDS", "30"))
+
+# In-process caches
+class LRUTTLCache:
+    """Bounded LRU cache whose entries also expire after a fixed TTL"""
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[Any, tuple]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        entry = self._entries.get(key)
+        if entry is None or entry[0] <= time.monotonic():
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def set(self, key, value, ttl_seconds: Optional[float] = None):
+        ttl = self.ttl_seconds if ttl_seconds is None else min(ttl_seconds, self.ttl_seconds)
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, key):
+        self._entries.pop(key, None)
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups * 100, 2) if lookups else 0.0
+        }
+
+# Resolved academy/player identity per Supabase user id. Writes through this
+# process invalidate explicitly; the TTL bounds staleness across workers.
+identity_cache = LRUTTLCache(
+    max_entries=int(os.getenv("IDENTITY_CACHE_MAX_ENTRIES", "10000")),
+    ttl_seconds=float(os.getenv("IDENTITY_CACHE_TTL_SECONDS", "60"))
+)
+
+# Verified access tokens (keyed by token hash), never held past the token's own expiry
+token_cache = LRUTTLCache(
+    max_entries=int(os.getenv("TOKEN_CACHE_MAX_ENTRIES", "10000")),
+    ttl_seconds=float(os.getenv("TOKEN_CACHE_TTL_SECONDS", "30"))
+)
+
+def invalidate_identity(supabase_user_id: Optional[str]):
+    """Drop cached academy/player identity for a Supabase user"""
+    if supabase_user_id:
+        identity_cache.invalidate(("academy", supabase_user_id))
+        identity_cache.invalidate(("player", supabase_user_id))
+
 # Create the main app without a prefix
 app = FastAPI()
 
@@ -451,6 +728,74 @@ def get_sport_performance_categories(sport: str) -> List[str]:
     """Get performance categories for a specific sport"""
     return SPORT_PERFORMANCE_CATEGORIES.get(sport, SPORT_PERFORMANCE_CATEGORIES["Other"])
 
+# Attendance documents store performance ratings column-wise (ratings_schema 1):
+#   performance_ratings        [int | None, ...] aligned to the record sport's categories
+#   performance_ratings_extra  {name: int} for ratings outside that list (e.g. "overall")
+# Documents without ratings_schema still hold the original {name: int} dict.
+# The category lists above are part of schema 1: reordering or renaming them
+# needs a new schema version and a migration.
+RATINGS_SCHEMA_VERSION = 1
+RATINGS_FIELDS = ["sport", "performance_ratings", "performance_ratings_extra", "ratings_schema"]
+
+def encode_performance_ratings(sport: Optional[str], ratings: Optional[Dict[str, Optional[int]]]) -> Dict[str, Any]:
+    """Fields to $set on an attendance document for a ratings dict"""
+    ratings = ratings or {}
+    categories = get_sport_performance_categories(sport)
+    values = [ratings.get(category) for category in categories]
+    while values and values[-1] is None:
+        values.pop()
+    return {
+        "performance_ratings": values,
+        "performance_ratings_extra": {k: v for k, v in ratings.items() if k not in categories and v is not None},
+        "ratings_schema": RATINGS_SCHEMA_VERSION
+    }
+
+def decode_performance_ratings(document: Dict[str, Any]) -> Dict[str, Optional[int]]:
+    """Ratings dict of an attendance document in either storage layout"""
+    if document.get("ratings_schema") != RATINGS_SCHEMA_VERSION:
+        return document.get("performance_ratings") or {}
+    categories = get_sport_performance_categories(document.get("sport"))
+    ratings = {
+        category: value
+        for category, value in zip(categories, document.get("performance_ratings") or [])
+        if value is not None
+    }
+    ratings.update(document.get("performance_ratings_extra") or {})
+    return ratings
+
+def decode_attendance_document(document: Dict[str, Any]) -> Dict[str, Any]:
+    """Replace the stored ratings fields with the API's ratings dict"""
+    if "performance_ratings" in document or "ratings_schema" in document:
+        document["performance_ratings"] = decode_performance_ratings(document)
+        document.pop("performance_ratings_extra", None)
+        document.pop("ratings_schema", None)
+    return document
+
+# Aggregation counterparts: the record's category list and its ratings as [{k, v}]
+_SPORT_CATEGORIES_EXPRESSION = {"$switch": {
+    "branches": [
+        {"case": {"$eq": ["$sport", sport]}, "then": {"$literal": categories}}
+        for sport, categories in SPORT_PERFORMANCE_CATEGORIES.items()
+        if sport != "Other"
+    ],
+    "default": {"$literal": SPORT_PERFORMANCE_CATEGORIES["Other"]}
+}}
+
+RATINGS_PAIRS_EXPRESSION = {"$cond": [
+    {"$eq": ["$ratings_schema", RATINGS_SCHEMA_VERSION]},
+    {"$concatArrays": [
+        {"$filter": {
+            "input": {"$map": {
+                "input": {"$zip": {"inputs": [_SPORT_CATEGORIES_EXPRESSION, {"$ifNull": ["$performance_ratings", []]}]}},
+                "in": {"k": {"$arrayElemAt": ["$$this", 0]}, "v": {"$arrayElemAt": ["$$this", 1]}}
+            }},
+            "cond": {"$ne": ["$$this.v", None]}
+        }},
+        {"$objectToArray": {"$ifNull": ["$performance_ratings_extra", {}]}}
+    ]},
+    {"$objectToArray": {"$ifNull": ["$performance_ratings", {}]}}
+]}
+
 def generate_default_password() -> str:
     """Generate a default password for new players"""
     import random
@@ -469,7 +814,7 @@ async def create_player_supabase_account(email: str, password: str, player_data:
             'role': 'player'
         }
         
-        response = supabase_admin.auth.admin.create_user({
+        response = await supabase_gateway.call(supabase_admin.auth.admin.create_user, {
             "email": email,
             "password": password,
             "email_confirm": True,  # Skip email confirmation for admin-created accounts
@@ -483,6 +828,147 @@ async def create_player_supabase_account(email: str, password: str, player_data:
         logger.error(f"Failed to create Supabase account for player: {e}")
         return None
 
+# Keyset Pagination
+# List endpoints page on (created_at, id); the opaque cursor carries the last
+# row's sort key and is returned in the X-Next-Cursor header. Paged requests
+# skip legacy rows missing either key, which a cursor could not point past.
+MAX_PAGE_SIZE = int(os.getenv("MAX_PAGE_SIZE", "1000"))
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+def encode_cursor(document: dict, sort_field: str = "created_at") -> str:
+    value = document.get(sort_field)
+    payload = [value.isoformat() if isinstance(value, datetime) else value, document.get("id")]
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str):
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        value, last_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return datetime.fromisoformat(value) if isinstance(value, str) else value, last_id
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid pagination cursor")
+
+async def paginate(
+    collection,
+    query: Dict[str, Any],
+    limit: Optional[int],
+    after: Optional[str] = None,
+    sort_field: str = "created_at",
+    descending: bool = False,
+    projection: Optional[Dict[str, Any]] = None
+):
+    """Fetch one keyset page; returns (documents, next_cursor or None).
+    
+    A ``limit`` of None returns every match in one response, without a cursor.
+    """
+    direction = DESCENDING if descending else ASCENDING
+    if limit is None and not after:
+        documents = await collection.find(query, projection).sort(
+            [(sort_field, direction), ("id", direction)]
+        ).to_list(None)
+        return documents, None
+    
+    limit = limit or MAX_PAGE_SIZE
+    query = {"$and": [query, {sort_field: {"$ne": None}, "id": {"$ne": None}}]}
+    if after:
+        value, last_id = decode_cursor(after)
+        op = "$lt" if descending else "$gt"
+        query = {"$and": [query, {"$or": [
+            {sort_field: {op: value}},
+            {sort_field: value, "id": {op: last_id}}
+        ]}]}
+    documents = await collection.find(query, projection).sort(
+        [(sort_field, direction), ("id", direction)]
+    ).limit(limit + 1).to_list(limit + 1)
+    
+    next_cursor = encode_cursor(documents[limit - 1], sort_field) if len(documents) > limit else None
+    return documents[:limit], next_cursor
+
+def without_none(**filters) -> Dict[str, Any]:
+    """Query filters for the list endpoints, dropping parameters that were not supplied"""
+    return {field: value for field, value in filters.items() if value is not None}
+
+# Single Round-Trip Updates
+async def update_scoped_document(
+    collection,
+    document_id: Optional[str],
+    update_data: Dict[str, Any],
+    not_found_detail: str,
+    academy_id: Optional[str] = None,
+    return_document: bool = ReturnDocument.AFTER,
+    upsert: bool = False,
+    set_on_insert: Optional[Dict[str, Any]] = None
+) -> dict:
+    """$set update_data on one document, scoped to its academy, in a single round trip.
+
+    Returns the document after the update (or before it, with
+    ReturnDocument.BEFORE) and raises 404 when nothing matches. An empty
+    update_data just reads the document.
+    """
+    query = {"id": document_id} if document_id is not None else {}
+    if academy_id is not None:
+        query["academy_id"] = academy_id
+    
+    if update_data:
+        update = {"$set": update_data}
+        if set_on_insert:
+            update["$setOnInsert"] = set_on_insert
+        document = await collection.find_one_and_update(
+            query, update, return_document=return_document, upsert=upsert
+        )
+    else:
+        document = await collection.find_one(query)
+    
+    if document is None:
+        raise HTTPException(status_code=404, detail=not_found_detail)
+    return document
+
+def registration_conflict(error: DuplicateKeyError, registration_number: Optional[str]) -> Exception:
+    """Map a players unique-index violation to the API's 400 response"""
+    if "registration_number" not in (error.details or {}).get("keyPattern", {}):
+        return error
+    if registration_number:
+        return HTTPException(status_code=400, detail=f"Registration number {registration_number} is already taken")
+    return HTTPException(status_code=400, detail="Registration number is already taken by an active player")
+
+# Set at startup once players.academy_registration_number_active_unique is
+# confirmed to exist; until then writes fall back to a (racy) pre-check
+registration_index_ready = False
+
+async def check_registration_index() -> bool:
+    global registration_index_ready
+    registration_index_ready = "academy_registration_number_active_unique" in await db.players.index_information()
+    if not registration_index_ready:
+        logger.warning("Registration number index is missing; checking duplicates before each write")
+    return registration_index_ready
+
+async def ensure_registration_number_available(academy_id: str, registration_number: Optional[str],
+                                               player_id: Optional[str] = None):
+    """Pre-write duplicate check, needed only while the unique index is missing"""
+    if registration_index_ready or not registration_number:
+        return
+    query = {"academy_id": academy_id, "registration_number": registration_number, "status": "active"}
+    if player_id:
+        query["id"] = {"$ne": player_id}  # Exclude current player
+    if await db.players.find_one(query, {"_id": 1}):
+        raise HTTPException(status_code=400, detail=f"Registration number {registration_number} is already taken")
+
+async def delete_supabase_account(supabase_user_id: str):
+    """Best-effort removal of a Supabase user created for a write that did not complete"""
+    try:
+        await supabase_gateway.call(supabase_admin.auth.admin.delete_user, supabase_user_id)
+    except Exception as e:
+        logger.warning(f"Failed to delete Supabase user {supabase_user_id}: {e}")
+
+async def remove_supabase_account(supabase_user_id: str):
+    """Delete a Supabase user, raising on failure; a user that is already gone counts as removed"""
+    try:
+        await supabase_gateway.call(supabase_admin.auth.admin.delete_user, supabase_user_id)
+    except Exception as e:
+        if getattr(e, "status", None) == 404:
+            return
+        raise
+
 # Enhanced Player and Coach Management Models
 class Player(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
@@ -713,15 +1199,152 @@ class PlayerPasswordChangeRequest(BaseModel):
     current_password: str
     new_password: str
 
+# Token Verification
+class TokenUser(BaseModel):
+    """Authenticated user reconstructed from verified access token claims"""
+    id: str
+    email: Optional[str] = None
+    phone: Optional[str] = None
+    role: Optional[str] = None
+    aud: Optional[str] = None
+    app_metadata: Dict[str, Any] = {}
+    user_metadata: Dict[str, Any] = {}
+
+class UnknownSigningKeyError(Exception):
+    """Raised when a token is signed with a key we cannot verify locally"""
+
+class SupabaseJWKSCache:
+    """Caches the project's JWKS signing keys with periodic refresh"""
+
+    def __init__(self, jwks_url: str, ttl_seconds: int, min_refresh_seconds: int):
+        self.jwks_url = jwks_url
+        self.ttl_seconds = ttl_seconds
+        self.min_refresh_seconds = min_refresh_seconds
+        self._keys: Dict[str, Any] = {}
+        self._fetched_at = 0.0
+        self._lock = asyncio.Lock()
+
+    def _fetch(self) -> Dict[str, Any]:
+        response = requests.get(self.jwks_url, headers={"apikey": supabase_key}, timeout=5)
+        response.raise_for_status()
+        return response.json()
+
+    async def refresh(self, force: bool = False):
+        async with self._lock:
+            age = time.monotonic() - self._fetched_at
+            # Another request may have refreshed while we waited on the lock
+            if not force and self._fetched_at and age < self.ttl_seconds:
+                return
+            if force and age < self.min_refresh_seconds:
+                return
+            jwks = await supabase_gateway.call(self._fetch)
+            keys = {}
+            for jwk in jwks.get("keys", []):
+                try:
+                    keys[jwk["kid"]] = jwt.PyJWK(jwk).key
+                except (KeyError, jwt.PyJWKError) as e:
+                    logger.warning(f"Skipping unusable JWKS key: {e}")
+            self._keys = keys
+            self._fetched_at = time.monotonic()
+
+    async def get_signing_key(self, kid: Optional[str]):
+        if not self._fetched_at or time.monotonic() - self._fetched_at >= self.ttl_seconds:
+            await self.refresh()
+        key = self._keys.get(kid)
+        if key is None:
+            # Key rotation: refetch once (rate-limited) before giving up
+            await self.refresh(force=True)
+            key = self._keys.get(kid)
+        if key is None:
+            raise UnknownSigningKeyError(f"Unknown signing key id: {kid}")
+        return key
+
+jwks_cache = SupabaseJWKSCache(SUPABASE_JWKS_URL, SUPABASE_JWKS_TTL_SECONDS, SUPABASE_JWKS_MIN_REFRESH_SECONDS)
+
+async def verify_token_locally(token: str) -> TokenUser:
+    """Validate signature, expiry and audience of a Supabase access token in-process"""
+    header = jwt.get_unverified_header(token)
+    algorithm = header.get("alg")
+    if algorithm == "HS256":
+        if not supabase_jwt_secret:
+            raise UnknownSigningKeyError("SUPABASE_JWT_SECRET is not configured")
+        key = supabase_jwt_secret
+    elif algorithm in ("RS256", "ES256"):
+        key = await jwks_cache.get_signing_key(header.get("kid"))
+    else:
+        raise jwt.InvalidAlgorithmError(f"Unsupported token algorithm: {algorithm}")
+
+    claims = jwt.decode(
+        token,
+        key,
+        algorithms=[algorithm],
+        audience=SUPABASE_JWT_AUDIENCE,
+        options={"require": ["exp", "sub"]}
+    )
+    return TokenUser(
+        id=claims["sub"],
+        email=claims.get("email"),
+        phone=claims.get("phone"),
+        role=claims.get("role"),
+        aud=claims.get("aud") if isinstance(claims.get("aud"), str) else SUPABASE_JWT_AUDIENCE,
+        app_metadata=claims.get("app_metadata") or {},
+        user_metadata=claims.get("user_metadata") or {}
+    )
+
+async def _verify_access_token_uncached(token: str):
+    if AUTH_VERIFY_MODE != "remote":
+        try:
+            return await verify_token_locally(token)
+        except UnknownSigningKeyError as e:
+            logger.info(f"Falling back to remote token verification: {e}")
+        except jwt.PyJWTError as e:
+            logger.info(f"Rejected access token: {e}")
+            return None
+
+    user_response = await supabase_gateway.call(supabase.auth.get_user, token)
+    return user_response.user if user_response and user_response.user else None
+
+_inflight_verifications: Dict[str, asyncio.Task] = {}
+
+async def _verify_and_cache_token(token: str, cache_key: str):
+    user = await _verify_access_token_uncached(token)
+    if user is not None:
+        try:
+            expires_at = jwt.decode(token, options={"verify_signature": False}).get("exp")
+        except jwt.PyJWTError:
+            expires_at = None
+        remaining = expires_at - time.time() if expires_at else None
+        if remaining is None or remaining > 0:
+            token_cache.set(cache_key, user, ttl_seconds=remaining)
+    return user
+
+async def verify_access_token(token: str):
+    """Resolve an access token to its user, or None if the token is not valid.
+
+    Concurrent requests carrying the same token share a single in-flight
+    verification, and successful results are cached briefly.
+    """
+    cache_key = hashlib.sha256(token.encode()).hexdigest()
+    user = token_cache.get(cache_key)
+    if user is not None:
+        return user
+
+    task = _inflight_verifications.get(cache_key)
+    if task is None:
+        task = asyncio.ensure_future(_verify_and_cache_token(token, cache_key))
+        _inflight_verifications[cache_key] = task
+        task.add_done_callback(lambda _: _inflight_verifications.pop(cache_key, None))
+    # Shield so one cancelled request does not cancel the shared verification
+    return await asyncio.shield(task)
+
 # Authentication helper functions
 async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
     if credentials is None:
         return None
     
     try:
-        # Verify JWT token with Supabase
-        user = supabase.auth.get_user(credentials.credentials)
-        return user.user if user.user else None
+        # Verify JWT token (locally when possible, otherwise with Supabase)
+        return await verify_access_token(credentials.credentials)
     except Exception as e:
         logger.error(f"Authentication error: {e}")
         return None
@@ -732,15 +1355,17 @@ async def get_academy_user_info(credentials: HTTPAuthorizationCredentials = Depe
         raise HTTPException(status_code=401, detail="Authentication required")
     
     try:
-        # Verify JWT token with Supabase
-        user_response = supabase.auth.get_user(credentials.credentials)
-        if not user_response.user:
+        # Verify JWT token (locally when possible, otherwise with Supabase)
+        user = await verify_access_token(credentials.credentials)
+        if not user:
             raise HTTPException(status_code=401, detail="Invalid token")
         
-        user = user_response.user
-        
         # Look up academy information for this user
-        academy = await db.academies.find_one({"supabase_user_id": user.id})
+        academy = identity_cache.get(("academy", user.id))
+        if academy is None:
+            academy = await db.academies.find_one({"supabase_user_id": user.id})
+            if academy:
+                identity_cache.set(("academy", user.id), academy)
         
         if not academy:
             # Check if this is a super admin
@@ -774,21 +1399,29 @@ async def require_academy_user(user_info = Depends(get_academy_user_info)):
         raise HTTPException(status_code=403, detail="Academy user access required")
     return user_info
 
+async def require_super_admin(user_info = Depends(get_academy_user_info)):
+    """Ensure user is the super admin"""
+    if user_info["role"] != "super_admin":
+        raise HTTPException(status_code=403, detail="Admin access required")
+    return user_info
+
 async def get_player_user_info(credentials: HTTPAuthorizationCredentials = Depends(security)):
     """Get authenticated player user info"""
     if credentials is None:
         raise HTTPException(status_code=401, detail="Authentication required")
     
     try:
-        # Verify JWT token with Supabase
-        user_response = supabase.auth.get_user(credentials.credentials)
-        if not user_response.user:
+        # Verify JWT token (locally when possible, otherwise with Supabase)
+        user = await verify_access_token(credentials.credentials)
+        if not user:
             raise HTTPException(status_code=401, detail="Invalid token")
         
-        user = user_response.user
-        
         # Look up player information for this user
-        player = await db.players.find_one({"supabase_user_id": user.id})
+        player = identity_cache.get(("player", user.id))
+        if player is None:
+            player = await db.players.find_one({"supabase_user_id": user.id})
+            if player:
+                identity_cache.set(("player", user.id), player)
         
         if not player:
             raise HTTPException(status_code=403, detail="No player profile associated with this user")
@@ -823,7 +1456,7 @@ async def root():
 async def supabase_health_check():
     try:
         # Test connection by getting user (will return None for anon key)
-        test_response = supabase.auth.get_user()
+        test_response = await supabase_gateway.call(supabase.auth.get_user)
         return SupabaseHealthResponse(
             status="healthy",
             supabase_url=supabase_url,
@@ -891,27 +1524,62 @@ async def upload_player_photo(file: UploadFile = File(...), user_info = Depends(
         logger.error(f"File upload error: {e}")
         raise HTTPException(status_code=500, detail="Failed to upload player photo")
 
+# ========== STATIC CONFIGURATION RESPONSES ==========
+
+# Sports configuration and billing plans only change with a deploy, so their
+# bodies are serialized once at import and revalidated by ETag
+STATIC_CONFIG_MAX_AGE_SECONDS = int(os.getenv("STATIC_CONFIG_MAX_AGE_SECONDS", "86400"))
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match uses weak comparison: W/ prefixes are ignored"""
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate in ("*", etag):
+            return True
+    return False
+
+class PreparedJSONResponse:
+    """A JSON body serialized once, served with a strong ETag"""
+    
+    def __init__(self, content: Any):
+        self.body = json.dumps(content, separators=(",", ":")).encode("utf-8")
+        self.etag = f'"{hashlib.sha256(self.body).hexdigest()[:32]}"'
+        self.headers = {"ETag": self.etag, "Cache-Control": f"public, max-age={STATIC_CONFIG_MAX_AGE_SECONDS}"}
+    
+    def respond(self, request: Request) -> Response:
+        if _etag_matches(request.headers.get("if-none-match"), self.etag):
+            return Response(status_code=304, headers=self.headers)
+        return Response(content=self.body, media_type="application/json", headers=self.headers)
+
+SPORT_POSITIONS_RESPONSE = PreparedJSONResponse(SportPositionsResponse(
+    sports=SPORT_POSITIONS,
+    training_days=TRAINING_DAYS,
+    training_batches=TRAINING_BATCHES
+).dict())
+SPORT_CONFIG_RESPONSE = PreparedJSONResponse(SportConfigResponse(
+    sports=SPORT_POSITIONS,
+    performance_categories=SPORT_PERFORMANCE_CATEGORIES,
+    individual_sports=INDIVIDUAL_SPORTS,
+    team_sports=TEAM_SPORTS,
+    training_days=TRAINING_DAYS,
+    training_batches=TRAINING_BATCHES
+).dict())
+SUBSCRIPTION_PLANS_RESPONSE = PreparedJSONResponse({"plans": SUBSCRIPTION_PLANS})
+
 # Sport and Position Configuration Endpoints
 @api_router.get("/sports/positions", response_model=SportPositionsResponse)
-async def get_sport_positions():
+async def get_sport_positions(request: Request):
     """Get available sports, positions, training days, and batches (Legacy endpoint)"""
-    return SportPositionsResponse(
-        sports=SPORT_POSITIONS,
-        training_days=TRAINING_DAYS,
-        training_batches=TRAINING_BATCHES
-    )
+    return SPORT_POSITIONS_RESPONSE.respond(request)
 
 @api_router.get("/sports/config", response_model=SportConfigResponse)
-async def get_sport_config():
+async def get_sport_config(request: Request):
     """Get enhanced sports configuration including performance categories and sport types"""
-    return SportConfigResponse(
-        sports=SPORT_POSITIONS,
-        performance_categories=SPORT_PERFORMANCE_CATEGORIES,
-        individual_sports=INDIVIDUAL_SPORTS,
-        team_sports=TEAM_SPORTS,
-        training_days=TRAINING_DAYS,
-        training_batches=TRAINING_BATCHES
-    )
+    return SPORT_CONFIG_RESPONSE.respond(request)
 
 # Authentication Endpoints
 
@@ -972,7 +1640,7 @@ async def admin_create_academy(
         }
         
         # Create academy account using admin privileges
-        response = supabase_admin.auth.admin.create_user({
+        response = await supabase_gateway.call(supabase_admin.auth.admin.create_user, {
             "email": email,
             "password": password,
             "email_confirm": True,  # Skip email confirmation for admin-created accounts
@@ -996,6 +1664,7 @@ async def admin_create_academy(
             )
             
             await db.academies.insert_one(academy_data.dict())
+            await record_activity("academy_created", f"New academy registration: {name}", "success")
             
             return AuthResponse(
                 user=response.user.model_dump() if hasattr(response.user, 'model_dump') else dict(response.user),
@@ -1011,14 +1680,27 @@ async def admin_create_academy(
 
 # Academy Management Endpoints
 @api_router.get("/admin/academies", response_model=List[Academy])
-async def get_academies(current_user = Depends(get_current_user)):
+async def get_academies(
+    response: Response,
+    status: Optional[str] = None,
+    sports_type: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[str] = None,
+    current_user = Depends(get_current_user)
+):
     try:
         # TODO: Add admin role verification
         # if not current_user or current_user.get('role') != 'admin':
         #     raise HTTPException(status_code=403, detail="Admin access required")
         
-        academies = await db.academies.find().to_list(1000)
+        academies, next_cursor = await paginate(
+            db.academies, without_none(status=status, sports_type=sports_type), limit, after
+        )
+        if next_cursor:
+            response.headers[NEXT_CURSOR_HEADER] = next_cursor
         return [Academy(**academy) for academy in academies]
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error fetching academies: {e}")
         raise HTTPException(status_code=500, detail="Failed to fetch academies")
@@ -1030,52 +1712,46 @@ async def update_academy(academy_id: str, academy_update: AcademyUpdate, current
         # if not current_user or current_user.get('role') != 'admin':
         #     raise HTTPException(status_code=403, detail="Admin access required")
         
-        # Find the academy
-        academy = await db.academies.find_one({"id": academy_id})
-        if not academy:
-            raise HTTPException(status_code=404, detail="Academy not found")
-        
-        # Update fields
+        # Update fields (the pre-update document drives cache invalidation and activity)
         update_data = academy_update.dict(exclude_unset=True)
         if update_data:
             update_data["updated_at"] = datetime.utcnow()
-            await db.academies.update_one(
-                {"id": academy_id},
-                {"$set": update_data}
-            )
+        academy = await update_scoped_document(
+            db.academies, academy_id, update_data, "Academy not found",
+            return_document=ReturnDocument.BEFORE
+        )
+        if update_data:
+            invalidate_identity(academy.get("supabase_user_id"))
+            await bump_academy_data_version(academy_id)
+            if update_data.get("status") == "approved" and academy.get("status") != "approved":
+                await record_activity("academy_approved", f"Academy approved: {academy.get('name', 'Unknown')}", "success")
+            else:
+                await record_activity("academy_updated", f"Academy updated: {academy.get('name', 'Unknown')}")
         
         # Return updated academy
-        updated_academy = await db.academies.find_one({"id": academy_id})
-        return Academy(**updated_academy)
+        return Academy(**{**academy, **update_data})
     except HTTPException:
         raise
     except Exception as e:
         logger.error(f"Error updating academy: {e}")
         raise HTTPException(status_code=500, detail="Failed to update academy")
 
-@api_router.delete("/admin/academies/{academy_id}")
-async def delete_academy(academy_id: str, current_user = Depends(get_current_user)):
+@api_router.delete("/admin/academies/{academy_id}", status_code=202)
+async def delete_academy(academy_id: str, user_info = Depends(require_super_admin)):
     try:
-        # TODO: Add admin role verification
-        # if not current_user or current_user.get('role') != 'admin':
-        #     raise HTTPException(status_code=403, detail="Admin access required")
-        
         # Find the academy
         academy = await db.academies.find_one({"id": academy_id})
         if not academy:
             raise HTTPException(status_code=404, detail="Academy not found")
         
-        # Delete from MongoDB
+        # Delete from MongoDB; members, records, uploads and Supabase users
+        # are removed by a background deletion job
         await db.academies.delete_one({"id": academy_id})
+        invalidate_identity(academy.get("supabase_user_id"))
+        await record_activity("academy_deleted", f"Academy deleted: {academy.get('name', 'Unknown')}")
+        job = await enqueue_deletion_job("academy", academy_id, academy_id, academy)
         
-        # TODO: Also delete the Supabase user if needed
-        # if academy.get('supabase_user_id'):
-        #     try:
-        #         supabase_admin.auth.admin.delete_user(academy['supabase_user_id'])
-        #     except Exception as e:
-        #         logger.warning(f"Failed to delete Supabase user: {e}")
-        
-        return {"message": "Academy deleted successfully"}
+        return {"message": "Academy deleted successfully", "deletion_job": public_deletion_job(job)}
     except HTTPException:
         raise
     except Exception as e:
@@ -1085,7 +1761,7 @@ async def delete_academy(academy_id: str, current_user = Depends(get_current_use
 @api_router.post("/auth/login", response_model=AuthResponse)
 async def login(request: SignInRequest):
     try:
-        response = supabase.auth.sign_in_with_password({
+        response = await supabase_gateway.call(supabase.auth.sign_in_with_password, {
             "email": request.email,
             "password": request.password
         })
@@ -1106,7 +1782,7 @@ async def login(request: SignInRequest):
 @api_router.post("/auth/logout")
 async def logout(current_user = Depends(get_current_user)):
     try:
-        supabase.auth.sign_out()
+        await supabase_gateway.call(supabase.auth.sign_out)
         return {"message": "Logout successful"}
     except Exception as e:
         logger.error(f"Logout error: {e}")
@@ -1163,7 +1839,7 @@ async def get_user(current_user = Depends(get_current_user)):
 @api_router.post("/auth/refresh", response_model=AuthResponse)
 async def refresh_token(input: RefreshRequest):
     try:
-        refreshed = supabase.auth.refresh_session(input.refresh_token)
+        refreshed = await supabase_gateway.call(supabase.auth.refresh_session, input.refresh_token)
         if refreshed.session:
             return {
                 "user": dict(refreshed.user) if hasattr(refreshed.user, "__iter__") else refreshed.user,
@@ -1194,10 +1870,26 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 @api_router.get("/status", response_model=List[StatusCheck])
-async def get_status_checks():
-    status_checks = await db.status_checks.find().to_list(1000)
+async def get_status_checks(
+    response: Response,
+    limit: int = Query(MAX_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[str] = None
+):
+    status_checks, next_cursor = await paginate(db.status_checks, {}, limit, after, sort_field="timestamp")
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
     return [StatusCheck(**status_check) for status_check in status_checks]
 
+# Cache Statistics Endpoint
+@api_router.get("/admin/cache-stats")
+async def get_cache_stats(user_info = Depends(require_super_admin)):
+    """Get hit/miss counters for the in-process caches"""
+    return {
+        "identity": identity_cache.stats(),
+        "tokens": {**token_cache.stats(), "in_flight": len(_inflight_verifications)},
+        "academy_analytics": analytics_cache.stats()
+    }
+
 # System Overview Models
 class SystemStats(BaseModel):
     total_academies: int
@@ -1229,6 +1921,60 @@ class SystemOverview(BaseModel):
     recent_academies: List[RecentAcademy]
     server_status: str
 
+# Activity Log
+# Capped, append-only record of admin-visible events; newest entries are read
+# back in reverse natural (insertion) order.
+ACTIVITY_LOG_MAX_BYTES = int(os.getenv("ACTIVITY_LOG_MAX_BYTES", str(8 * 1024 * 1024)))
+ACTIVITY_LOG_MAX_ENTRIES = int(os.getenv("ACTIVITY_LOG_MAX_ENTRIES", "20000"))
+
+async def ensure_activity_log():
+    """Create the capped activity_log collection, seeding it from existing data"""
+    if "activity_log" in await db.list_collection_names(filter={"name": "activity_log"}):
+        return
+    try:
+        await db.create_collection(
+            "activity_log", capped=True, size=ACTIVITY_LOG_MAX_BYTES, max=ACTIVITY_LOG_MAX_ENTRIES
+        )
+    except Exception as e:
+        # Another worker created it first
+        logger.info(f"Activity log not created: {e}")
+        return
+    
+    seed = []
+    async for academy in db.academies.find().sort("created_at", -1).limit(10):
+        seed.append(RecentActivity(
+            id=str(uuid.uuid4()),
+            type="academy_created",
+            description=f"New academy registration: {academy.get('name', 'Unknown')}",
+            timestamp=academy.get('created_at', datetime.utcnow()),
+            status="success" if academy.get('status') == 'approved' else "pending"
+        ).dict())
+    async for demo in db.demo_requests.find().sort("created_at", -1).limit(10):
+        seed.append(RecentActivity(
+            id=str(uuid.uuid4()),
+            type="demo_request",
+            description=f"Demo request from: {demo.get('academy_name', 'Unknown Academy')}",
+            timestamp=demo.get('created_at', datetime.utcnow()),
+            status=demo.get('status', 'pending')
+        ).dict())
+    if seed:
+        seed.sort(key=lambda activity: activity["timestamp"])
+        await db.activity_log.insert_many(seed)
+
+async def record_activity(activity_type: str, description: str, status: str = "info"):
+    """Append an entry to the activity log; failures never break the caller"""
+    try:
+        activity = RecentActivity(
+            id=str(uuid.uuid4()),
+            type=activity_type,
+            description=description,
+            timestamp=datetime.utcnow(),
+            status=status
+        )
+        await db.activity_log.insert_one(activity.dict())
+    except Exception as e:
+        logger.warning(f"Failed to record activity {activity_type}: {e}")
+
 # System Overview Endpoint
 @api_router.get("/admin/system-overview", response_model=SystemOverview)
 async def get_system_overview(current_user = Depends(get_current_user)):
@@ -1237,68 +1983,43 @@ async def get_system_overview(current_user = Depends(get_current_user)):
         # if not current_user or current_user.get('role') != 'admin':
         #     raise HTTPException(status_code=403, detail="Admin access required")
         
-        # Get academy stats
-        academies = await db.academies.find().to_list(1000)
-        total_academies = len(academies)
-        active_academies = len([a for a in academies if a.get('status') == 'approved'])
-        pending_academies = len([a for a in academies if a.get('status') == 'pending'])
-        
-        # Get demo request stats
-        demo_requests = await db.demo_requests.find().to_list(1000)
-        total_demo_requests = len(demo_requests)
-        pending_demo_requests = len([d for d in demo_requests if d.get('status') == 'pending'])
+        # Status counts, recent activity and recent academies in concurrent cheap reads
+        thirty_days_ago = datetime.utcnow() - timedelta(days=30)
+        academy_statuses, demo_statuses, recent_activity_count, activity_docs, recent_academies_data = await asyncio.gather(
+            db.academies.aggregate([{"$group": {"_id": "$status", "count": {"$sum": 1}}}]).to_list(length=None),
+            db.demo_requests.aggregate([{"$group": {"_id": "$status", "count": {"$sum": 1}}}]).to_list(length=None),
+            db.activity_log.count_documents({"timestamp": {"$gte": thirty_days_ago}}),
+            db.activity_log.find({}, {"_id": 0}).sort("$natural", -1).limit(10).to_list(10),
+            db.academies.find(
+                {},
+                {"_id": 0, "id": 1, "name": 1, "owner_name": 1, "location": 1, "sports_type": 1, "status": 1, "created_at": 1}
+            ).sort("created_at", -1).limit(5).to_list(5)
+        )
+        academy_counts = {group["_id"]: group["count"] for group in academy_statuses}
+        demo_counts = {group["_id"]: group["count"] for group in demo_statuses}
         
         # Create stats
         stats = SystemStats(
-            total_academies=total_academies,
-            active_academies=active_academies,
-            pending_academies=pending_academies,
-            total_demo_requests=total_demo_requests,
-            pending_demo_requests=pending_demo_requests,
-            recent_activity_count=len(academies) + len(demo_requests)
+            total_academies=sum(academy_counts.values()),
+            active_academies=academy_counts.get("approved", 0),
+            pending_academies=academy_counts.get("pending", 0),
+            total_demo_requests=sum(demo_counts.values()),
+            pending_demo_requests=demo_counts.get("pending", 0),
+            recent_activity_count=recent_activity_count
         )
         
-        # Get recent activities (last 10)
-        recent_activities = []
-        
-        # Recent academy activities
-        recent_academy_activities = await db.academies.find().sort("created_at", -1).limit(5).to_list(5)
-        for academy in recent_academy_activities:
-            activity = RecentActivity(
-                id=str(uuid.uuid4()),
-                type="academy_created",
-                description=f"New academy registration: {academy.get('name', 'Unknown')}",
-                timestamp=academy.get('created_at', datetime.utcnow()),
-                status="success" if academy.get('status') == 'approved' else "pending"
-            )
-            recent_activities.append(activity)
-        
-        # Recent demo request activities
-        recent_demo_activities = await db.demo_requests.find().sort("created_at", -1).limit(5).to_list(5)
-        for demo in recent_demo_activities:
-            activity = RecentActivity(
-                id=str(uuid.uuid4()),
-                type="demo_request",
-                description=f"Demo request from: {demo.get('academy_name', 'Unknown Academy')}",
-                timestamp=demo.get('created_at', datetime.utcnow()),
-                status=demo.get('status', 'pending')
-            )
-            recent_activities.append(activity)
-        
-        # Sort by timestamp (newest first) and limit to 10
-        recent_activities.sort(key=lambda x: x.timestamp, reverse=True)
-        recent_activities = recent_activities[:10]
+        # Recent activities (last 10) from the append-only activity log
+        recent_activities = [RecentActivity(**activity) for activity in activity_docs]
         
-        # Get recently added academies (last 5)
-        recent_academies_data = await db.academies.find().sort("created_at", -1).limit(5).to_list(5)
+        # Recently added academies (last 5)
         recent_academies = []
         for academy in recent_academies_data:
             academy_obj = RecentAcademy(
                 id=academy.get('id', str(uuid.uuid4())),
-                name=academy.get('name', 'Unknown'),
-                owner_name=academy.get('owner_name', 'Unknown'),
-                location=academy.get('location', 'Unknown'),
-                sports_type=academy.get('sports_type', 'Unknown'),
+                name=academy.get('name') or 'Unknown',
+                owner_name=academy.get('owner_name') or 'Unknown',
+                location=academy.get('location') or 'Unknown',
+                sports_type=academy.get('sports_type') or 'Unknown',
                 status=academy.get('status', 'pending'),
                 created_at=academy.get('created_at', datetime.utcnow())
             )
@@ -1328,6 +2049,9 @@ async def create_demo_request(request: DemoRequestCreate):
     try:
         demo_request_data = DemoRequest(**request.dict())
         await db.demo_requests.insert_one(demo_request_data.dict())
+        await record_activity(
+            "demo_request", f"Demo request from: {demo_request_data.academy_name}", demo_request_data.status
+        )
         
         logger.info(f"Demo request created: {demo_request_data.full_name} - {demo_request_data.academy_name}")
         return demo_request_data
@@ -1337,14 +2061,26 @@ async def create_demo_request(request: DemoRequestCreate):
 
 # Admin endpoints for managing demo requests
 @api_router.get("/admin/demo-requests", response_model=List[DemoRequest])
-async def get_demo_requests(current_user = Depends(get_current_user)):
+async def get_demo_requests(
+    response: Response,
+    status: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[str] = None,
+    current_user = Depends(get_current_user)
+):
     try:
         # TODO: Add admin role verification
         # if not current_user or current_user.get('role') != 'admin':
         #     raise HTTPException(status_code=403, detail="Admin access required")
         
-        demo_requests = await db.demo_requests.find().sort("created_at", -1).to_list(1000)
+        demo_requests, next_cursor = await paginate(
+            db.demo_requests, without_none(status=status), limit, after, descending=True
+        )
+        if next_cursor:
+            response.headers[NEXT_CURSOR_HEADER] = next_cursor
         return [DemoRequest(**request) for request in demo_requests]
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error fetching demo requests: {e}")
         raise HTTPException(status_code=500, detail="Failed to fetch demo requests")
@@ -1369,6 +2105,11 @@ async def update_demo_request(request_id: str, request_update: DemoRequestUpdate
                 {"id": request_id},
                 {"$set": update_data}
             )
+            await record_activity(
+                "demo_request_updated",
+                f"Demo request from {demo_request.get('academy_name', 'Unknown Academy')} marked {update_data.get('status')}",
+                update_data.get("status", "info")
+            )
         
         # Return updated request
         updated_request = await db.demo_requests.find_one({"id": request_id})
@@ -1383,10 +2124,10 @@ async def update_demo_request(request_id: str, request_update: DemoRequestUpdate
 
 # Get Available Subscription Plans
 @api_router.get("/billing/plans")
-async def get_subscription_plans():
+async def get_subscription_plans(request: Request):
     """Get all available subscription plans with pricing"""
     try:
-        return {"plans": SUBSCRIPTION_PLANS}
+        return SUBSCRIPTION_PLANS_RESPONSE.respond(request)
     except Exception as e:
         logger.error(f"Error fetching subscription plans: {e}")
         raise HTTPException(status_code=500, detail="Failed to fetch subscription plans")
@@ -1641,26 +2382,54 @@ async def get_academy_subscription(academy_id: str, current_user = Depends(get_c
 
 # Admin: Get All Subscriptions
 @api_router.get("/admin/billing/subscriptions", response_model=List[AcademySubscription])
-async def get_all_subscriptions(current_user = Depends(get_current_user)):
+async def get_all_subscriptions(
+    response: Response,
+    status: Optional[str] = None,
+    academy_id: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[str] = None,
+    current_user = Depends(get_current_user)
+):
     """Admin endpoint to get all academy subscriptions"""
     try:
         # TODO: Add admin role verification
         
-        subscriptions = await db.academy_subscriptions.find().to_list(1000)
+        subscriptions, next_cursor = await paginate(
+            db.academy_subscriptions, without_none(status=status, academy_id=academy_id), limit, after
+        )
+        if next_cursor:
+            response.headers[NEXT_CURSOR_HEADER] = next_cursor
         return [AcademySubscription(**sub) for sub in subscriptions]
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error fetching subscriptions: {e}")
         raise HTTPException(status_code=500, detail="Failed to fetch subscriptions")
 
 # Admin: Get All Payment Transactions
 @api_router.get("/admin/billing/transactions", response_model=List[PaymentTransaction])
-async def get_payment_transactions(current_user = Depends(get_current_user)):
+async def get_payment_transactions(
+    response: Response,
+    payment_status: Optional[str] = None,
+    academy_id: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[str] = None,
+    current_user = Depends(get_current_user)
+):
     """Admin endpoint to get all payment transactions"""
     try:
         # TODO: Add admin role verification
         
-        transactions = await db.payment_transactions.find().sort("created_at", -1).to_list(1000)
+        transactions, next_cursor = await paginate(
+            db.payment_transactions,
+            without_none(payment_status=payment_status, academy_id=academy_id),
+            limit, after, descending=True
+        )
+        if next_cursor:
+            response.headers[NEXT_CURSOR_HEADER] = next_cursor
         return [PaymentTransaction(**txn) for txn in transactions]
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error fetching payment transactions: {e}")
         raise HTTPException(status_code=500, detail="Failed to fetch payment transactions")
@@ -1684,9 +2453,13 @@ async def update_academy_subscription(
         # Update subscription
         subscription_data["updated_at"] = datetime.utcnow()
         
+        on_insert = {"id": str(uuid.uuid4()), "created_at": subscription_data["updated_at"]}
         result = await db.academy_subscriptions.update_one(
             {"academy_id": academy_id},
-            {"$set": subscription_data},
+            {
+                "$set": subscription_data,
+                "$setOnInsert": {k: v for k, v in on_insert.items() if k not in subscription_data}
+            },
             upsert=True
         )
         
@@ -1751,24 +2524,15 @@ async def update_manual_payment(
     try:
         # TODO: Add admin role verification
         
-        # Check if payment exists
-        existing_payment = await db.payment_transactions.find_one({"id": payment_id})
-        if not existing_payment:
-            raise HTTPException(status_code=404, detail="Payment transaction not found")
-        
         # Prepare update data (only include non-None fields)
         update_data = {k: v for k, v in payment_data.dict().items() if v is not None}
         update_data["updated_at"] = datetime.utcnow()
         
-        # Update payment transaction
-        await db.payment_transactions.update_one(
-            {"id": payment_id},
-            {"$set": update_data}
+        # Update payment transaction and return the result
+        updated_payment = await update_scoped_document(
+            db.payment_transactions, payment_id, update_data, "Payment transaction not found"
         )
         
-        # Get updated payment
-        updated_payment = await db.payment_transactions.find_one({"id": payment_id})
-        
         return PaymentTransaction(**updated_payment)
         
     except HTTPException:
@@ -1864,11 +2628,6 @@ async def update_manual_subscription(
     try:
         # TODO: Add admin role verification
         
-        # Check if subscription exists
-        existing_subscription = await db.academy_subscriptions.find_one({"id": subscription_id})
-        if not existing_subscription:
-            raise HTTPException(status_code=404, detail="Subscription not found")
-        
         # Prepare update data (only include non-None fields)
         update_data = {k: v for k, v in subscription_data.dict().items() if v is not None}
         update_data["updated_at"] = datetime.utcnow()
@@ -1877,15 +2636,11 @@ async def update_manual_subscription(
         if "plan_id" in update_data and update_data["plan_id"] not in SUBSCRIPTION_PLANS:
             raise HTTPException(status_code=404, detail="Subscription plan not found")
         
-        # Update subscription
-        await db.academy_subscriptions.update_one(
-            {"id": subscription_id},
-            {"$set": update_data}
+        # Update subscription and return the result
+        updated_subscription = await update_scoped_document(
+            db.academy_subscriptions, subscription_id, update_data, "Subscription not found"
         )
         
-        # Get updated subscription
-        updated_subscription = await db.academy_subscriptions.find_one({"id": subscription_id})
-        
         return AcademySubscription(**updated_subscription)
         
     except HTTPException:
@@ -1917,18 +2672,139 @@ async def delete_payment_transaction(payment_id: str, current_user = Depends(get
         logger.error(f"Error deleting payment transaction: {e}")
         raise HTTPException(status_code=500, detail="Failed to delete payment transaction")
 
+# ========== ACADEMY COUNTERS ==========
+
+# Per-academy member counts kept on one academy_counters document and moved
+# with $inc by the player/coach write paths; reconcile_academy_counters
+# recomputes them from source.
+ACADEMY_COUNTER_FIELDS = ["total_players", "active_players", "total_coaches", "active_coaches"]
+
+async def reconcile_academy_counters(academy_id: Optional[str] = None) -> int:
+    """Recompute member counters from players/coaches; returns academies written"""
+    match = {"academy_id": academy_id} if academy_id else {}
+    counters: Dict[str, Dict[str, int]] = {}
+    if academy_id:
+        counters[academy_id] = {}
+    for collection_name, prefix in (("players", "players"), ("coaches", "coaches")):
+        pipeline = [
+            {"$match": match},
+            {"$group": {
+                "_id": "$academy_id",
+                "total": {"$sum": 1},
+                "active": {"$sum": {"$cond": [{"$eq": ["$status", "active"]}, 1, 0]}}
+            }}
+        ]
+        async for group in db[collection_name].aggregate(pipeline):
+            counters.setdefault(group["_id"], {})
+            counters[group["_id"]][f"total_{prefix}"] = group["total"]
+            counters[group["_id"]][f"active_{prefix}"] = group["active"]
+    
+    now = datetime.utcnow()
+    operations = [
+        UpdateOne(
+            {"academy_id": counter_academy_id},
+            {"$set": {**{field: values.get(field, 0) for field in ACADEMY_COUNTER_FIELDS}, "reconciled_at": now}},
+            upsert=True
+        )
+        for counter_academy_id, values in counters.items()
+    ]
+    if operations:
+        await db.academy_counters.bulk_write(operations, ordered=False)
+    return len(operations)
+
+async def get_academy_counters(academy_id: str) -> Dict[str, Any]:
+    """Read an academy's member counters, building them on first use"""
+    counters = await db.academy_counters.find_one({"academy_id": academy_id})
+    if counters is None:
+        await reconcile_academy_counters(academy_id)
+        counters = await db.academy_counters.find_one({"academy_id": academy_id})
+    return counters
+
+async def adjust_academy_counters(academy_id: str, **deltas: int):
+    """Apply counter deltas after a player/coach write"""
+    deltas = {field: delta for field, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    result = await db.academy_counters.update_one({"academy_id": academy_id}, {"$inc": deltas})
+    if result.matched_count == 0:
+        # No counters yet: build them from source, which already includes this write
+        await reconcile_academy_counters(academy_id)
+
+async def reserve_academy_slot(academy_id: str, member_type: str, limit: int) -> bool:
+    """Atomically count one more active player/coach if the academy is under its limit.
+
+    ``member_type`` is "players" or "coaches". A successful reservation must be
+    followed by the insert, or undone with release_academy_slot.
+    """
+    active_field = f"active_{member_type}"
+    for _ in range(2):
+        result = await db.academy_counters.update_one(
+            {"academy_id": academy_id, active_field: {"$lt": limit}},
+            {"$inc": {active_field: 1, f"total_{member_type}": 1}}
+        )
+        if result.modified_count:
+            return True
+        # Either the limit is reached or the counters do not exist yet
+        if await db.academy_counters.count_documents({"academy_id": academy_id}, limit=1):
+            return False
+        await reconcile_academy_counters(academy_id)
+    return False
+
+async def release_academy_slot(academy_id: str, member_type: str):
+    """Compensate a reservation whose insert did not happen"""
+    await adjust_academy_counters(academy_id, **{f"active_{member_type}": -1, f"total_{member_type}": -1})
+
+# Academy data version: bumped by player, coach, settings and academy writes
+# so derived per-academy results can be cached under (academy_id, version).
+# Kept in its own collection so counter reconciliation never resets it.
+async def get_academy_data_version(academy_id: str) -> int:
+    version = await db.academy_data_versions.find_one({"academy_id": academy_id}, {"_id": 0, "version": 1})
+    return version["version"] if version else 0
+
+async def bump_academy_data_version(academy_id: str):
+    await db.academy_data_versions.update_one(
+        {"academy_id": academy_id},
+        {"$inc": {"version": 1}, "$set": {"updated_at": datetime.utcnow()}},
+        upsert=True
+    )
+
+# Computed AcademyAnalytics per (academy_id, data version). Other workers'
+# writes are seen through the shared version; the TTL refreshes the
+# time-relative figures (recent additions, academy age).
+analytics_cache = LRUTTLCache(
+    max_entries=int(os.getenv("ANALYTICS_CACHE_MAX_ENTRIES", "1000")),
+    ttl_seconds=float(os.getenv("ANALYTICS_CACHE_TTL_SECONDS", "300"))
+)
+
 # ========== PLAYER MANAGEMENT ENDPOINTS ==========
 
 # Get all players for an academy (Academy User)
 @api_router.get("/academy/players", response_model=List[Player])
-async def get_academy_players(user_info = Depends(require_academy_user)):
-    """Get all players for the authenticated academy"""
+async def get_academy_players(
+    response: Response,
+    status: Optional[str] = None,
+    sport: Optional[str] = None,
+    position: Optional[str] = None,
+    training_batch: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[str] = None,
+    user_info = Depends(require_academy_user)
+):
+    """Get players for the authenticated academy; all of them unless ``limit`` asks for keyset pages"""
     try:
         academy_id = user_info["academy_id"]
         
         # Get players for this academy
-        players_cursor = db.players.find({"academy_id": academy_id})
-        players = await players_cursor.to_list(length=None)
+        players, next_cursor = await paginate(
+            db.players,
+            without_none(
+                academy_id=academy_id, status=status, sport=sport,
+                position=position, training_batch=training_batch
+            ),
+            limit, after
+        )
+        if next_cursor:
+            response.headers[NEXT_CURSOR_HEADER] = next_cursor
         
         return [Player(**player) for player in players]
         
@@ -1942,31 +2818,19 @@ async def get_academy_players(user_info = Depends(require_academy_user)):
 @api_router.post("/academy/players", response_model=Player)
 async def create_player(player_data: PlayerCreate, user_info = Depends(require_academy_user)):
     """Create a new player for the authenticated academy"""
+    slot_reserved = False
     try:
         academy_id = user_info["academy_id"]
         academy = user_info["academy"]
         
-        # Check if academy has reached player limit
-        current_players = await db.players.count_documents({"academy_id": academy_id, "status": "active"})
-        if current_players >= academy.get("player_limit", 50):
+        # Reserve a player slot against the plan limit (released below unless the insert succeeds)
+        slot_reserved = await reserve_academy_slot(academy_id, "players", academy.get("player_limit", 50))
+        if not slot_reserved:
             raise HTTPException(
                 status_code=400, 
                 detail=f"Academy has reached maximum player limit of {academy.get('player_limit', 50)}"
             )
         
-        # Check for duplicate registration number within academy (if provided)
-        if player_data.registration_number:
-            existing_registration = await db.players.find_one({
-                "academy_id": academy_id,
-                "registration_number": player_data.registration_number,
-                "status": "active"
-            })
-            if existing_registration:
-                raise HTTPException(
-                    status_code=400,
-                    detail=f"Registration number {player_data.registration_number} is already taken"
-                )
-        
         # Prepare player data with enhancements
         player_dict = player_data.dict()
         
@@ -1991,6 +2855,8 @@ async def create_player(player_data: PlayerCreate, user_info = Depends(require_a
                         detail=f"Invalid position '{player_data.position}' for sport '{player_data.sport}'"
                     )
         
+        await ensure_registration_number_available(academy_id, player_data.registration_number)
+        
         # Auto-generate login credentials if email is provided
         supabase_user_id = None
         default_password = None
@@ -2024,8 +2890,16 @@ async def create_player(player_data: PlayerCreate, user_info = Depends(require_a
             **player_dict
         )
         
-        # Save to database
-        await db.players.insert_one(player.dict())
+        # Save to database; the reservation now accounts for this player.
+        # Duplicate registration numbers are rejected by the unique partial index.
+        try:
+            await db.players.insert_one(player.dict())
+        except DuplicateKeyError as e:
+            if supabase_user_id:
+                await delete_supabase_account(supabase_user_id)
+            raise registration_conflict(e, player_data.registration_number)
+        slot_reserved = False
+        await bump_academy_data_version(user_info["academy_id"])
         
         return player
         
@@ -2034,6 +2908,9 @@ async def create_player(player_data: PlayerCreate, user_info = Depends(require_a
     except Exception as e:
         logger.error(f"Error creating player: {e}")
         raise HTTPException(status_code=500, detail="Failed to create player")
+    finally:
+        if slot_reserved:
+            await release_academy_slot(user_info["academy_id"], "players")
 
 # Get specific player (Academy User)
 @api_router.get("/academy/players/{player_id}", response_model=Player)
@@ -2062,25 +2939,6 @@ async def update_player(player_id: str, player_data: PlayerUpdate, user_info = D
     try:
         academy_id = user_info["academy_id"]
         
-        # Check if player exists
-        existing_player = await db.players.find_one({"id": player_id, "academy_id": academy_id})
-        if not existing_player:
-            raise HTTPException(status_code=404, detail="Player not found")
-        
-        # Check for duplicate registration number (if updating registration number)
-        if player_data.registration_number is not None:
-            existing_registration = await db.players.find_one({
-                "academy_id": academy_id,
-                "registration_number": player_data.registration_number,
-                "status": "active",
-                "id": {"$ne": player_id}  # Exclude current player
-            })
-            if existing_registration:
-                raise HTTPException(
-                    status_code=400,
-                    detail=f"Registration number {player_data.registration_number} is already taken"
-                )
-        
         # Prepare update data with enhancements
         update_data = {k: v for k, v in player_data.dict().items() if v is not None}
         
@@ -2107,14 +2965,26 @@ async def update_player(player_id: str, player_data: PlayerUpdate, user_info = D
         
         update_data["updated_at"] = datetime.utcnow()
         
-        await db.players.update_one(
-            {"id": player_id, "academy_id": academy_id},
-            {"$set": update_data}
-        )
+        await ensure_registration_number_available(academy_id, player_data.registration_number, player_id)
+        
+        # The pre-update document gives the previous status for the counters;
+        # duplicate registration numbers are rejected by the unique partial index
+        try:
+            existing_player = await update_scoped_document(
+                db.players, player_id, update_data, "Player not found",
+                academy_id=academy_id, return_document=ReturnDocument.BEFORE
+            )
+        except DuplicateKeyError as e:
+            raise registration_conflict(e, player_data.registration_number)
+        invalidate_identity(existing_player.get("supabase_user_id"))
+        await bump_academy_data_version(academy_id)
+        if "status" in update_data:
+            was_active = existing_player.get("status") == "active"
+            await adjust_academy_counters(
+                academy_id, active_players=int(update_data["status"] == "active") - int(was_active)
+            )
         
-        # Get updated player
-        updated_player = await db.players.find_one({"id": player_id, "academy_id": academy_id})
-        return Player(**updated_player)
+        return Player(**{**existing_player, **update_data})
         
     except HTTPException:
         raise
@@ -2123,9 +2993,13 @@ async def update_player(player_id: str, player_data: PlayerUpdate, user_info = D
         raise HTTPException(status_code=500, detail="Failed to update player")
 
 # Delete player (Academy User)
-@api_router.delete("/academy/players/{player_id}")
+@api_router.delete("/academy/players/{player_id}", status_code=202)
 async def delete_player(player_id: str, user_info = Depends(require_academy_user)):
-    """Delete specific player for the authenticated academy"""
+    """Delete specific player for the authenticated academy.
+
+    The player is removed immediately; attendance, targeted announcements,
+    the photo and the Supabase account are removed by a background deletion job.
+    """
     try:
         academy_id = user_info["academy_id"]
         
@@ -2135,9 +3009,16 @@ async def delete_player(player_id: str, user_info = Depends(require_academy_user
             raise HTTPException(status_code=404, detail="Player not found")
         
         # Delete player
-        await db.players.delete_one({"id": player_id, "academy_id": academy_id})
+        delete_result = await db.players.delete_one({"id": player_id, "academy_id": academy_id})
+        invalidate_identity(existing_player.get("supabase_user_id"))
+        if delete_result.deleted_count:
+            await adjust_academy_counters(
+                academy_id, total_players=-1, active_players=-int(existing_player.get("status") == "active")
+            )
+            await bump_academy_data_version(academy_id)
+        job = await enqueue_deletion_job("player", player_id, academy_id, existing_player)
         
-        return {"message": "Player deleted successfully"}
+        return {"message": "Player deleted successfully", "deletion_job": public_deletion_job(job)}
         
     except HTTPException:
         raise
@@ -2145,6 +3026,978 @@ async def delete_player(player_id: str, user_info = Depends(require_academy_user
         logger.error(f"Error deleting player: {e}")
         raise HTTPException(status_code=500, detail="Failed to delete player")
 
+# ========== DELETION JOBS ==========
+
+# Deleting a player or academy removes the primary document inline and
+# persists a deletion_jobs entry for everything that depends on it. A worker
+# claims jobs with a lease, runs their steps in bounded, throttled batches
+# and records per-step progress; a job interrupted by a restart is picked up
+# again once its lease expires.
+DELETION_BATCH_SIZE = int(os.getenv("DELETION_BATCH_SIZE", "500"))
+# Player batches make one Supabase call per member, so they stay small
+DELETION_SUPABASE_BATCH_SIZE = int(os.getenv("DELETION_SUPABASE_BATCH_SIZE", "50"))
+DELETION_BATCH_PAUSE_SECONDS = float(os.getenv("DELETION_BATCH_PAUSE_SECONDS", "0.1"))
+DELETION_JOB_LEASE_SECONDS = int(os.getenv("DELETION_JOB_LEASE_SECONDS", "300"))
+DELETION_JOB_MAX_ATTEMPTS = int(os.getenv("DELETION_JOB_MAX_ATTEMPTS", "3"))
+DELETION_POLL_SECONDS = int(os.getenv("DELETION_POLL_SECONDS", "30"))
+DELETION_WORKER_ENABLED = os.getenv("DELETION_WORKER_ENABLED", "true").lower() == "true"
+
+# Fields of the deleted document the job still needs once it is gone
+DELETION_SNAPSHOT_FIELDS = ["name", "supabase_user_id", "logo_url", "photo_url"]
+
+deletion_jobs_wakeup: Optional[asyncio.Event] = None
+
+async def delete_batch(collection, query: Dict[str, Any], limit: int) -> int:
+    """Delete up to ``limit`` documents matching ``query``; returns how many went"""
+    ids = [doc["_id"] async for doc in collection.find(query, {"_id": 1}).limit(limit)]
+    if not ids:
+        return 0
+    return (await collection.delete_many({"_id": {"$in": ids}})).deleted_count
+
+def _upload_file(url: Optional[str]) -> Optional[Path]:
+    """Local file behind an /uploads/logos/ URL"""
+    if not url or "/uploads/logos/" not in url:
+        return None
+    return UPLOAD_DIR / Path(url).name
+
+def _remove_uploads(paths) -> int:
+    removed = 0
+    for path in paths:
+        if path and path.is_file():
+            path.unlink()
+            removed += 1
+    return removed
+
+def public_deletion_job(job: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        key: job.get(key)
+        for key in ("id", "kind", "target_id", "status", "current_step", "progress",
+                    "completed_steps", "error", "created_at", "updated_at", "completed_at")
+    }
+
+async def enqueue_deletion_job(kind: str, target_id: str, academy_id: str, document: Dict[str, Any]) -> Dict[str, Any]:
+    now = datetime.utcnow()
+    job = {
+        "id": str(uuid.uuid4()),
+        "kind": kind,
+        "target_id": target_id,
+        "academy_id": academy_id,
+        "snapshot": {field: document.get(field) for field in DELETION_SNAPSHOT_FIELDS},
+        "status": "pending",
+        "current_step": None,
+        "completed_steps": [],
+        "progress": {},
+        "attempts": 0,
+        "error": None,
+        "created_at": now,
+        "updated_at": now,
+        "completed_at": None
+    }
+    await db.deletion_jobs.insert_one(job)
+    if deletion_jobs_wakeup is not None:
+        deletion_jobs_wakeup.set()
+    return job
+
+class DeletionJobRunner:
+    """Runs one claimed deletion job step by step"""
+    
+    def __init__(self, job: Dict[str, Any]):
+        self.job = job
+        self.player_query = {"academy_id": job["academy_id"], "player_id": job["target_id"]}
+        self.academy_query = {"academy_id": job["academy_id"]}
+    
+    async def _progress(self, step: str, deleted: int):
+        self.job["progress"][step] = self.job["progress"].get(step, 0) + deleted
+        await self._renew_lease({f"progress.{step}": self.job["progress"][step]})
+    
+    async def _renew_lease(self, fields: Optional[Dict[str, Any]] = None):
+        now = datetime.utcnow()
+        await db.deletion_jobs.update_one({"id": self.job["id"]}, {
+            "$set": {
+                **(fields or {}),
+                "updated_at": now,
+                "lease_until": now + timedelta(seconds=DELETION_JOB_LEASE_SECONDS)
+            }
+        })
+    
+    async def _drain(self, step: str, delete_one_batch):
+        """Repeat ``delete_one_batch`` until it deletes nothing, pausing between batches"""
+        while True:
+            deleted = await delete_one_batch(DELETION_BATCH_SIZE)
+            if not deleted:
+                return
+            await self._progress(step, deleted)
+            await asyncio.sleep(DELETION_BATCH_PAUSE_SECONDS)
+    
+    def _collection_step(self, collection, query):
+        return lambda step: self._drain(step, partial(delete_batch, collection, query))
+    
+    async def _delete_players(self, step: str):
+        """Academy members: their Supabase accounts and photos go with each batch"""
+        while True:
+            players = await db.players.find(
+                self.academy_query, {"_id": 1, "supabase_user_id": 1, "photo_url": 1}
+            ).limit(DELETION_SUPABASE_BATCH_SIZE).to_list(None)
+            if not players:
+                return
+            for player in players:
+                if player.get("supabase_user_id"):
+                    invalidate_identity(player["supabase_user_id"])
+                    # Raises so the job retries instead of dropping an account it failed to remove
+                    await remove_supabase_account(player["supabase_user_id"])
+                    await self._renew_lease()
+            _remove_uploads(_upload_file(player.get("photo_url")) for player in players)
+            result = await db.players.delete_many({"_id": {"$in": [player["_id"] for player in players]}})
+            await self._progress(step, result.deleted_count)
+            await asyncio.sleep(DELETION_BATCH_PAUSE_SECONDS)
+    
+    async def _delete_player_uploads(self, step: str):
+        await self._progress(step, _remove_uploads([_upload_file(self.job["snapshot"].get("photo_url"))]))
+    
+    async def _delete_academy_uploads(self, step: str):
+        settings = await db.academy_settings.find_one(self.academy_query, {"_id": 0, "logo_url": 1}) or {}
+        academy_id = self.job["academy_id"]
+        paths = [
+            _upload_file(self.job["snapshot"].get("logo_url")),
+            _upload_file(settings.get("logo_url")),
+            *UPLOAD_DIR.glob(f"{academy_id}_*"),
+            *UPLOAD_DIR.glob(f"player_{academy_id}_*")
+        ]
+        await self._progress(step, _remove_uploads(paths))
+    
+    async def _delete_supabase_account(self, step: str):
+        supabase_user_id = self.job["snapshot"].get("supabase_user_id")
+        if supabase_user_id:
+            await remove_supabase_account(supabase_user_id)
+            await self._progress(step, 1)
+    
+    def steps(self) -> List[Tuple[str, Any]]:
+        if self.job["kind"] == "player":
+            return [
+                ("attendance", lambda step: self._drain(step, partial(attendance_storage.delete_batch, self.player_query))),
+                ("attendance_archive", self._collection_step(db.attendance_archive, self.player_query)),
+                ("attendance_monthly", self._collection_step(db.attendance_monthly, self.player_query)),
+                ("player_stats", self._collection_step(db.player_stats, {"player_id": self.job["target_id"]})),
+                ("announcements", self._collection_step(
+                    db.announcements, {"academy_id": self.job["academy_id"], "target_player_id": self.job["target_id"]}
+                )),
+                ("uploads", self._delete_player_uploads),
+                ("supabase_account", self._delete_supabase_account),
+            ]
+        return [
+            # Uploads first: the settings document still names the logo
+            ("uploads", self._delete_academy_uploads),
+            ("players", self._delete_players),
+            ("coaches", self._collection_step(db.coaches, self.academy_query)),
+            ("attendance", lambda step: self._drain(step, partial(attendance_storage.delete_batch, self.academy_query))),
+            ("attendance_archive", self._collection_step(db.attendance_archive, self.academy_query)),
+            ("attendance_monthly", self._collection_step(db.attendance_monthly, self.academy_query)),
+            ("player_stats", self._collection_step(db.player_stats, self.academy_query)),
+            ("announcements", self._collection_step(db.announcements, self.academy_query)),
+            ("payments", self._collection_step(db.payment_transactions, self.academy_query)),
+            ("subscriptions", self._collection_step(db.academy_subscriptions, self.academy_query)),
+            ("settings", self._collection_step(db.academy_settings, self.academy_query)),
+            ("counters", self._collection_step(db.academy_counters, self.academy_query)),
+            ("data_version", self._collection_step(db.academy_data_versions, self.academy_query)),
+            ("supabase_account", self._delete_supabase_account),
+        ]
+    
+    async def run(self):
+        for step, run_step in self.steps():
+            if step in self.job["completed_steps"]:
+                continue
+            await db.deletion_jobs.update_one({"id": self.job["id"]}, {"$set": {"current_step": step}})
+            await run_step(step)
+            self.job["completed_steps"].append(step)
+            await db.deletion_jobs.update_one({"id": self.job["id"]}, {"$addToSet": {"completed_steps": step}})
+
+async def claim_deletion_job() -> Optional[Dict[str, Any]]:
+    now = datetime.utcnow()
+    return await db.deletion_jobs.find_one_and_update(
+        {"$or": [
+            {"status": "pending"},
+            {"status": "running", "lease_until": {"$lt": now}}  # Worker died mid-job
+        ]},
+        {
+            "$set": {"status": "running", "lease_until": now + timedelta(seconds=DELETION_JOB_LEASE_SECONDS), "updated_at": now},
+            "$inc": {"attempts": 1}
+        },
+        sort=[("created_at", ASCENDING)],
+        return_document=ReturnDocument.AFTER
+    )
+
+async def run_deletion_job(job: Dict[str, Any]):
+    try:
+        await DeletionJobRunner(job).run()
+        now = datetime.utcnow()
+        await db.deletion_jobs.update_one({"id": job["id"]}, {
+            "$set": {"status": "completed", "current_step": None, "completed_at": now, "updated_at": now},
+            "$unset": {"lease_until": ""}
+        })
+        if job["kind"] == "academy":
+            await record_activity(
+                "academy_data_deleted", f"Academy data removed: {job['snapshot'].get('name') or job['target_id']}"
+            )
+    except Exception as e:
+        logger.error(f"Deletion job {job['id']} failed: {e}")
+        status = "failed" if job.get("attempts", 1) >= DELETION_JOB_MAX_ATTEMPTS else "pending"
+        await db.deletion_jobs.update_one({"id": job["id"]}, {
+            "$set": {"status": status, "error": str(e), "updated_at": datetime.utcnow()},
+            "$unset": {"lease_until": ""}
+        })
+
+async def run_pending_deletion_jobs() -> int:
+    """Run claimable jobs until none are left; returns jobs run"""
+    ran = 0
+    while True:
+        job = await claim_deletion_job()
+        if job is None:
+            return ran
+        await run_deletion_job(job)
+        ran += 1
+
+async def run_deletion_worker():
+    """Background loop: drain jobs, then wait for a new one or the poll interval"""
+    while True:
+        try:
+            await run_pending_deletion_jobs()
+        except Exception as e:
+            logger.error(f"Deletion worker error: {e}")
+        try:
+            await asyncio.wait_for(deletion_jobs_wakeup.wait(), DELETION_POLL_SECONDS)
+        except asyncio.TimeoutError:
+            pass
+        deletion_jobs_wakeup.clear()
+
+# Get deletion job progress (Academy User)
+@api_router.get("/academy/deletion-jobs/{job_id}")
+async def get_academy_deletion_job(job_id: str, user_info = Depends(require_academy_user)):
+    job = await db.deletion_jobs.find_one({"id": job_id, "academy_id": user_info["academy_id"], "kind": "player"})
+    if not job:
+        raise HTTPException(status_code=404, detail="Deletion job not found")
+    return public_deletion_job(job)
+
+# Get deletion job progress (Admin)
+@api_router.get("/admin/deletion-jobs/{job_id}")
+async def get_admin_deletion_job(job_id: str, user_info = Depends(require_super_admin)):
+    job = await db.deletion_jobs.find_one({"id": job_id})
+    if not job:
+        raise HTTPException(status_code=404, detail="Deletion job not found")
+    return public_deletion_job(job)
+
+# ========== ATTENDANCE STORAGE ==========
+
+# "documents": one player_attendance document per (player_id, academy_id, date).
+# "buckets": one attendance_buckets document per (academy_id, player_id, month)
+# holding that month's records - far fewer index entries for long histories.
+# Switch with `python server.py migrate-attendance-layout --to <layout>`
+# followed by a restart with ATTENDANCE_STORAGE set to match.
+ATTENDANCE_STORAGE = os.getenv("ATTENDANCE_STORAGE", "documents").lower()
+# Previous-state fields the rollup deltas need; updated_at doubles as the
+# version guard on attendance writes
+ATTENDANCE_ROLLUP_FIELDS = ["date", "present", "updated_at", *RATINGS_FIELDS]
+ATTENDANCE_WRITE_ATTEMPTS = int(os.getenv("ATTENDANCE_WRITE_ATTEMPTS", "5"))
+
+async def upsert_records_guarded(storage, academy_id: str, records: List[Tuple[str, str, Dict[str, Any]]],
+                                 now: datetime) -> List[Optional[Dict[str, Any]]]:
+    """Write (player_id, date, fields) records in one bulk write; returns each
+    record's state before the write, or None where the write created it.
+
+    Previous states are read with one query and every write is guarded on the
+    read state's updated_at. A guard that misses (a concurrent mark got there
+    first) surfaces as a duplicate-key error, and only those records are
+    re-read and rewritten.
+    """
+    previous: List[Optional[Dict[str, Any]]] = [None] * len(records)
+    pending = list(range(len(records)))
+    for _ in range(ATTENDANCE_WRITE_ATTEMPTS):
+        if not pending:
+            return previous
+        states = {
+            (state["player_id"], state["date"]): state
+            async for state in storage.find(
+                {
+                    "academy_id": academy_id,
+                    "player_id": {"$in": list({records[i][0] for i in pending})},
+                    "date": {"$in": list({records[i][1] for i in pending})}
+                },
+                {"_id": 0, "player_id": 1, **{field: 1 for field in ATTENDANCE_ROLLUP_FIELDS}}
+            )
+        }
+        for i in pending:
+            previous[i] = states.get(records[i][:2])
+        try:
+            await storage.collection.bulk_write(
+                [storage.write_operation(academy_id, *records[i], previous[i], now) for i in pending],
+                ordered=False
+            )
+            pending = []
+        except BulkWriteError as e:
+            write_errors = e.details.get("writeErrors", [])
+            if any(error.get("code") != 11000 for error in write_errors):
+                raise
+            pending = [pending[error["index"]] for error in write_errors]
+    if pending:
+        raise RuntimeError(f"Attendance writes kept conflicting for {len(pending)} records")
+    return previous
+
+class DocumentAttendanceStorage:
+    """Attendance records stored one document each"""
+    
+    name = "documents"
+    
+    def __init__(self, collection):
+        self.collection = collection
+    
+    def aggregate(self, match: Dict[str, Any], stages: List[Dict[str, Any]] = ()):
+        """Run ``stages`` over the records matching ``match``"""
+        return self.collection.aggregate([{"$match": match}, *stages])
+    
+    def find(self, query: Dict[str, Any], projection: Optional[Dict[str, Any]] = None, sort=None,
+             limit: int = 0, batch_size: Optional[int] = None):
+        cursor = self.collection.find(query, projection)
+        if sort:
+            cursor = cursor.sort(sort)
+        if limit:
+            cursor = cursor.limit(limit)
+        if batch_size:
+            cursor = cursor.batch_size(batch_size)
+        return cursor
+    
+    def write_operation(self, academy_id: str, player_id: str, date: str, fields: Dict[str, Any],
+                        previous: Optional[Dict[str, Any]], now: datetime):
+        """Insert, or update guarded on the previous updated_at; a miss hits the unique index"""
+        key = {"player_id": player_id, "academy_id": academy_id, "date": date}
+        if previous is None:
+            return InsertOne({"id": str(uuid.uuid4()), **key, **fields, "created_at": now})
+        return UpdateOne(
+            {**key, "updated_at": previous.get("updated_at", {"$exists": False})},
+            {"$set": fields, "$setOnInsert": {"id": str(uuid.uuid4()), "created_at": now}},
+            upsert=True
+        )
+    
+    async def upsert_records(self, academy_id: str, records: List[Tuple[str, str, Dict[str, Any]]],
+                             now: datetime) -> List[Optional[Dict[str, Any]]]:
+        return await upsert_records_guarded(self, academy_id, records, now)
+    
+    async def delete_records(self, query: Dict[str, Any]) -> int:
+        return (await self.collection.delete_many(query)).deleted_count
+    
+    async def delete_batch(self, query: Dict[str, Any], limit: int) -> int:
+        return await delete_batch(self.collection, query, limit)
+
+class BucketedAttendanceStorage:
+    """Attendance records stored in per-player monthly buckets.
+
+    Reads unwind the buckets back into the flat record shape, so callers
+    pass the same queries and pipeline stages as for the document layout.
+    """
+    
+    name = "buckets"
+    
+    def __init__(self, collection):
+        self.collection = collection
+    
+    @staticmethod
+    def _month_condition(condition):
+        """Widen a condition on record dates to one on bucket months.
+
+        Operators that cannot be widened ($ne, $nin, $exists, ...) are left
+        out; None means every month, and the per-record filter does the work.
+        """
+        if isinstance(condition, str):
+            return condition[:7]
+        if not isinstance(condition, dict):
+            return None
+        month = {}
+        for operator, value in condition.items():
+            if operator in ("$gte", "$gt"):
+                month["$gte"] = value[:7]
+            elif operator in ("$lte", "$lt"):
+                month["$lte"] = value[:7]
+            elif operator == "$in":
+                month["$in"] = sorted({date[:7] for date in value})
+            elif operator == "$eq":
+                month["$eq"] = value[:7]
+        return month or None
+    
+    def _bucket_match(self, query: Dict[str, Any]) -> Dict[str, Any]:
+        bucket_match = {key: query[key] for key in ("academy_id", "player_id") if key in query}
+        month = self._month_condition(query["date"]) if "date" in query else None
+        if month is not None:
+            bucket_match["month"] = month
+        return bucket_match
+    
+    def _record_stages(self, match: Dict[str, Any]) -> List[Dict[str, Any]]:
+        return [
+            {"$match": self._bucket_match(match)},
+            {"$unwind": "$records"},
+            {"$replaceRoot": {"newRoot": {"$mergeObjects": [
+                {"academy_id": "$academy_id", "player_id": "$player_id"}, "$records"
+            ]}}},
+            {"$match": match}
+        ]
+    
+    def aggregate(self, match: Dict[str, Any], stages: List[Dict[str, Any]] = (), **kwargs):
+        return self.collection.aggregate(self._record_stages(match) + list(stages), allowDiskUse=True, **kwargs)
+    
+    def find(self, query: Dict[str, Any], projection: Optional[Dict[str, Any]] = None, sort=None,
+             limit: int = 0, batch_size: Optional[int] = None):
+        stages = []
+        if sort:
+            stages.append({"$sort": dict(sort)})
+        if limit:
+            stages.append({"$limit": limit})
+        if projection:
+            stages.append({"$project": projection})
+        return self.aggregate(query, stages, **({"batchSize": batch_size} if batch_size else {}))
+    
+    def write_operation(self, academy_id: str, player_id: str, date: str, fields: Dict[str, Any],
+                        previous: Optional[Dict[str, Any]], now: datetime):
+        """Push, or update guarded on the previous updated_at; a miss hits the unique bucket index"""
+        bucket = {"academy_id": academy_id, "player_id": player_id, "month": date[:7]}
+        if previous is None:
+            # The date filter keeps two concurrent pushes from duplicating a record
+            return UpdateOne(
+                {**bucket, "records.date": {"$ne": date}},
+                {"$push": {"records": {"id": str(uuid.uuid4()), "date": date, **fields, "created_at": now}}},
+                upsert=True
+            )
+        guard = {"date": date, "updated_at": previous.get("updated_at", {"$exists": False})}
+        return UpdateOne(
+            {**bucket, "records": {"$elemMatch": guard}},
+            [{"$set": {"records": {"$map": {
+                "input": {"$ifNull": ["$records", []]},
+                "as": "record",
+                "in": {"$cond": [
+                    {"$eq": ["$$record.date", date]},
+                    {"$mergeObjects": ["$$record", {key: {"$literal": value} for key, value in fields.items()}]},
+                    "$$record"
+                ]}
+            }}}}],
+            upsert=True
+        )
+    
+    async def upsert_records(self, academy_id: str, records: List[Tuple[str, str, Dict[str, Any]]],
+                             now: datetime) -> List[Optional[Dict[str, Any]]]:
+        return await upsert_records_guarded(self, academy_id, records, now)
+    
+    async def delete_records(self, query: Dict[str, Any]) -> int:
+        bucket_match = self._bucket_match(query)
+        record_condition = {key: value for key, value in query.items() if key not in ("academy_id", "player_id")}
+        if not record_condition:
+            deleted = 0
+            async for bucket in self.collection.find(bucket_match, {"_id": 0, "count": {"$size": "$records"}}):
+                deleted += bucket["count"]
+            await self.collection.delete_many(bucket_match)
+            return deleted
+        result = await self.collection.update_many(bucket_match, {"$pull": {"records": record_condition}})
+        await self.collection.delete_many({**bucket_match, "records": {"$size": 0}})
+        return result.modified_count
+    
+    async def delete_batch(self, query: Dict[str, Any], limit: int) -> int:
+        """Delete the buckets of up to ``limit`` records for an academy_id/player_id query"""
+        buckets = await self.collection.find(
+            self._bucket_match(query), {"_id": 1, "count": {"$size": "$records"}}
+        ).limit(max(1, limit // 31)).to_list(None)
+        if not buckets:
+            return 0
+        await self.collection.delete_many({"_id": {"$in": [bucket["_id"] for bucket in buckets]}})
+        return sum(bucket["count"] for bucket in buckets) or len(buckets)
+
+def get_attendance_storage(layout: str):
+    if layout == "buckets":
+        return BucketedAttendanceStorage(db.attendance_buckets)
+    if layout == "documents":
+        return DocumentAttendanceStorage(db.player_attendance)
+    raise ValueError(f"Unknown attendance storage layout '{layout}'")
+
+attendance_storage = get_attendance_storage(ATTENDANCE_STORAGE)
+
+async def migrate_attendance_layout(target: str) -> int:
+    """Copy every attendance record into the ``target`` layout; returns records copied.
+
+    The source collection is left in place. Stop attendance writes while this
+    runs and restart with ATTENDANCE_STORAGE=<target> afterwards.
+    """
+    copied = 0
+    operations = []
+    
+    async def flush(collection, force=False):
+        if operations and (force or len(operations) >= PLAYER_STATS_BATCH_SIZE):
+            await collection.bulk_write(operations, ordered=False)
+            operations.clear()
+    
+    if target == "buckets":
+        bucket_key, bucket_records = None, []
+        
+        async def close_bucket():
+            if bucket_key is not None:
+                academy_id, player_id, month = bucket_key
+                key = {"academy_id": academy_id, "player_id": player_id, "month": month}
+                operations.append(ReplaceOne(key, {**key, "records": bucket_records}, upsert=True))
+                await flush(db.attendance_buckets)
+        
+        cursor = db.player_attendance.find({}, {"_id": 0}).sort(
+            [("player_id", ASCENDING), ("academy_id", ASCENDING), ("date", ASCENDING)]
+        )
+        async for record in cursor:
+            key = (record.pop("academy_id"), record.pop("player_id"), record["date"][:7])
+            if key != bucket_key:
+                await close_bucket()
+                bucket_key, bucket_records = key, []
+            record.update(encode_performance_ratings(record.get("sport"), decode_performance_ratings(record)))
+            bucket_records.append(record)
+            copied += 1
+        await close_bucket()
+        await flush(db.attendance_buckets, force=True)
+    elif target == "documents":
+        async for bucket in db.attendance_buckets.find({}, {"_id": 0}):
+            for record in bucket.get("records", []):
+                document = {"academy_id": bucket["academy_id"], "player_id": bucket["player_id"], **record}
+                operations.append(ReplaceOne(
+                    {"player_id": document["player_id"], "academy_id": document["academy_id"], "date": document["date"]},
+                    document,
+                    upsert=True
+                ))
+                copied += 1
+                await flush(db.player_attendance)
+        await flush(db.player_attendance, force=True)
+    else:
+        raise ValueError(f"Unknown attendance storage layout '{target}'")
+    return copied
+
+# ========== ATTENDANCE ARCHIVE ==========
+
+# Whole months older than ATTENDANCE_ARCHIVE_AFTER_DAYS move out of the live
+# attendance store into attendance_archive: one document per
+# (academy_id, player_id, month) holding that month's records as a compressed
+# BSON blob. Reads that reach archived months merge the blobs back in; when a
+# date exists in both places the live record wins.
+ATTENDANCE_ARCHIVE_AFTER_DAYS = int(os.getenv("ATTENDANCE_ARCHIVE_AFTER_DAYS", "730"))
+ATTENDANCE_ARCHIVE_INTERVAL_SECONDS = int(os.getenv("ATTENDANCE_ARCHIVE_INTERVAL_SECONDS", "0"))  # 0 disables the background job
+ARCHIVE_CODEC = "zstd" if zstandard else "zlib"
+
+def compress_archive_records(records: List[Dict[str, Any]]) -> Tuple[str, bytes]:
+    payload = bson.encode({"records": records})
+    if ARCHIVE_CODEC == "zstd":
+        return "zstd", zstandard.ZstdCompressor(level=10).compress(payload)
+    return "zlib", zlib.compress(payload, 9)
+
+def decompress_archive_records(blob: Dict[str, Any]) -> List[Dict[str, Any]]:
+    data = bytes(blob["data"])
+    if blob.get("codec") == "zstd":
+        if zstandard is None:
+            raise RuntimeError("Attendance archive is zstd-compressed but the zstandard package is not installed")
+        payload = zstandard.ZstdDecompressor().decompress(data)
+    else:
+        payload = zlib.decompress(data)
+    return bson.decode(payload)["records"]
+
+async def iter_archived_records(academy_id: Optional[str] = None, player_id: Optional[str] = None,
+                                start_date: Optional[str] = None, end_date: Optional[str] = None):
+    """Yield archived records month by month, ordered by (date, player_id) within each month"""
+    query = without_none(academy_id=academy_id, player_id=player_id)
+    month_range = without_none(**{"$gte": start_date and start_date[:7], "$lte": end_date and end_date[:7]})
+    if month_range:
+        query["month"] = month_range
+    
+    async def flush(month_records):
+        month_records.sort(key=lambda record: (record["date"], record["player_id"]))
+        for record in month_records:
+            yield record
+    
+    current_month, month_records = None, []
+    async for blob in db.attendance_archive.find(query).sort([("month", ASCENDING)]):
+        if blob["month"] != current_month:
+            async for record in flush(month_records):
+                yield record
+            current_month, month_records = blob["month"], []
+        for record in decompress_archive_records(blob):
+            if (start_date and record["date"] < start_date) or (end_date and record["date"] > end_date):
+                continue
+            month_records.append({"academy_id": blob["academy_id"], "player_id": blob["player_id"], **record})
+    async for record in flush(month_records):
+        yield record
+
+async def _next_or_none(iterator):
+    try:
+        return await iterator.__anext__()
+    except StopAsyncIteration:
+        return None
+
+async def merge_archived_records(live, archived):
+    """Merge two (date, player_id)-ordered record streams; live records win ties"""
+    def key(record):
+        return record["date"], record["player_id"]
+    
+    archived = archived.__aiter__()
+    pending = await _next_or_none(archived)
+    async for record in live:
+        while pending is not None and key(pending) < key(record):
+            yield pending
+            pending = await _next_or_none(archived)
+        if pending is not None and key(pending) == key(record):
+            pending = await _next_or_none(archived)
+        yield record
+    while pending is not None:
+        yield pending
+        pending = await _next_or_none(archived)
+
+async def iter_attendance_history(query: Dict[str, Any], projection: Optional[Dict[str, Any]] = None):
+    """Live then archived records for an academy_id/player_id query (unordered).
+
+    Archived copies of dates that also have a live record are skipped. The
+    live keys are held in memory, so scope the query to one academy or player.
+    """
+    live_keys = set()
+    async for record in attendance_storage.find(query, projection):
+        live_keys.add((record["academy_id"], record["player_id"], record["date"]))
+        yield record
+    async for record in iter_archived_records(query.get("academy_id"), query.get("player_id")):
+        if (record["academy_id"], record["player_id"], record["date"]) not in live_keys:
+            yield record
+
+async def attendance_history_scopes(academy_id: Optional[str] = None, player_id: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Split a rebuild into per-academy queries (or the one player's) to bound its memory"""
+    if player_id or academy_id:
+        return [without_none(player_id=player_id, academy_id=academy_id)]
+    academy_ids = set(await attendance_storage.collection.distinct("academy_id"))
+    academy_ids.update(await db.attendance_archive.distinct("academy_id"))
+    return [{"academy_id": scope_academy} for scope_academy in sorted(academy_ids)]
+
+async def archived_player_records(player_id: str, academy_id: Optional[str] = None) -> List[Dict[str, Any]]:
+    """A player's archived records, minus dates that also have a live record"""
+    archived = [record async for record in iter_archived_records(academy_id, player_id)]
+    if archived:
+        live_query = without_none(player_id=player_id, academy_id=academy_id)
+        live_query["date"] = {"$in": [record["date"] for record in archived]}
+        live = {(r["academy_id"], r["date"]) async for r in attendance_storage.find(live_query, {"_id": 0, "academy_id": 1, "date": 1})}
+        archived = [record for record in archived if (record["academy_id"], record["date"]) not in live]
+    return archived
+
+async def unshadowed_archived_records(academy_id: str, start_date: Optional[str] = None,
+                                     end_date: Optional[str] = None):
+    """An academy's archived records in a date range, minus dates that also have
+    a live record; live keys are loaded one archived month at a time"""
+    month_query = {"academy_id": academy_id}
+    month_range = without_none(**{"$gte": start_date and start_date[:7], "$lte": end_date and end_date[:7]})
+    if month_range:
+        month_query["month"] = month_range
+    for month in sorted(await db.attendance_archive.distinct("month", month_query)):
+        month_start = max(start_date or "", f"{month}-01")
+        month_end = min(end_date or f"{month}-31", f"{month}-31")
+        live = {
+            (r["player_id"], r["date"])
+            async for r in attendance_storage.find(
+                {"academy_id": academy_id, "date": {"$gte": month_start, "$lte": month_end}},
+                {"_id": 0, "player_id": 1, "date": 1}
+            )
+        }
+        async for record in iter_archived_records(academy_id, None, month_start, month_end):
+            if (record["player_id"], record["date"]) not in live:
+                yield record
+
+async def latest_attendance_records(query: Dict[str, Any], limit: int, projection: Optional[Dict[str, Any]] = None):
+    """Newest ``limit`` records for a player_id query, topping up from the archive"""
+    records = await attendance_storage.find(
+        query, projection, sort=[("date", DESCENDING)], limit=limit
+    ).to_list(limit)
+    if len(records) < limit:
+        archived = [
+            record for record in await archived_player_records(query["player_id"], query.get("academy_id"))
+            if all(record.get(field) == value for field, value in query.items())
+        ]
+        archived.sort(key=lambda record: record["date"], reverse=True)
+        records.extend(archived[:limit - len(records)])
+    return records
+
+async def archive_attendance(before_month: Optional[str] = None, academy_id: Optional[str] = None) -> int:
+    """Move whole months before ``before_month`` (default: the configured
+    cutoff) into attendance_archive; returns records archived"""
+    if before_month is None:
+        before_month = (datetime.utcnow() - timedelta(days=ATTENDANCE_ARCHIVE_AFTER_DAYS)).strftime("%Y-%m")
+    started_at = datetime.utcnow()
+    query = {**without_none(academy_id=academy_id), "date": {"$lt": before_month}}
+    
+    archived = 0
+    current_key, month_records = None, []
+    
+    async def archive_month():
+        if current_key is None:
+            return 0
+        academy, player, month = current_key
+        key = {"academy_id": academy, "player_id": player, "month": month}
+        # A month archived before may have received late writes since: merge by date
+        existing = await db.attendance_archive.find_one(key)
+        merged = {record["date"]: record for record in (decompress_archive_records(existing) if existing else [])}
+        merged.update({record["date"]: record for record in month_records})
+        codec, data = compress_archive_records([merged[date] for date in sorted(merged)])
+        await db.attendance_archive.replace_one(key, {
+            **key,
+            "codec": codec,
+            "data": Binary(data),
+            "record_count": len(merged),
+            "archived_at": started_at
+        }, upsert=True)
+        # Records rewritten while the job runs stay live (and win on reads)
+        await attendance_storage.delete_records({
+            "academy_id": academy,
+            "player_id": player,
+            "date": {"$in": [record["date"] for record in month_records]},
+            "updated_at": {"$not": {"$gt": started_at}}
+        })
+        return len(month_records)
+    
+    cursor = attendance_storage.find(
+        query, {"_id": 0}, sort=[("player_id", ASCENDING), ("academy_id", ASCENDING), ("date", ASCENDING)]
+    )
+    async for record in cursor:
+        key = (record.pop("academy_id"), record.pop("player_id"), record["date"][:7])
+        if key != current_key:
+            archived += await archive_month()
+            current_key, month_records = key, []
+        month_records.append(record)
+    archived += await archive_month()
+    return archived
+
+async def run_attendance_archiver():
+    """Background loop archiving attendance every ATTENDANCE_ARCHIVE_INTERVAL_SECONDS"""
+    while True:
+        await asyncio.sleep(ATTENDANCE_ARCHIVE_INTERVAL_SECONDS)
+        try:
+            archived = await archive_attendance()
+            if archived:
+                logger.info(f"Archived {archived} attendance records")
+        except Exception as e:
+            logger.error(f"Attendance archival failed: {e}")
+
+# ========== PLAYER PERFORMANCE ROLLUPS ==========
+
+# player_stats holds one small read model per player, moved with $inc as
+# attendance is written:
+#   total_sessions / attended_sessions
+#   overall: {sum, count}                      "overall" ratings of attended sessions
+#   categories: {<category>: {sum, count}}     every rating of attended sessions
+#   months: {<YYYY-MM>: {total_sessions, attended_sessions, rating_sum, rating_count}}
+# A missing document is rebuilt from attendance history on first read.
+
+PLAYER_STATS_BATCH_SIZE = 500
+
+def _is_rollup_key(key: str) -> bool:
+    """Rating names become field paths; skip ones MongoDB cannot address"""
+    return bool(key) and "." not in key and not key.startswith("$")
+
+def attendance_contribution(record: Dict[str, Any], sign: int = 1) -> Dict[str, float]:
+    """$inc deltas that one attendance record adds to its player's rollup"""
+    month = f"months.{record['date'][:7]}"
+    inc = {"total_sessions": sign, f"{month}.total_sessions": sign}
+    if record.get("present"):
+        inc["attended_sessions"] = sign
+        inc[f"{month}.attended_sessions"] = sign
+        ratings = decode_performance_ratings(record)
+        overall = ratings.get("overall")
+        if overall is not None:
+            inc["overall.sum"] = sign * overall
+            inc["overall.count"] = sign
+            inc[f"{month}.rating_sum"] = sign * overall
+            inc[f"{month}.rating_count"] = sign
+        for category, rating in ratings.items():
+            if rating is not None and _is_rollup_key(category):
+                inc[f"categories.{category}.sum"] = sign * rating
+                inc[f"categories.{category}.count"] = sign
+    return inc
+
+def merge_increments(target: Dict[str, float], increments: Dict[str, float]) -> Dict[str, float]:
+    for field, delta in increments.items():
+        target[field] = target.get(field, 0) + delta
+    return target
+
+def _nest_fields(flat: Dict[str, float]) -> Dict[str, Any]:
+    """Turn dotted $inc paths into the nested document they produce"""
+    nested: Dict[str, Any] = {}
+    for path, value in flat.items():
+        node = nested
+        *parents, leaf = path.split(".")
+        for parent in parents:
+            node = node.setdefault(parent, {})
+        node[leaf] = value
+    return nested
+
+async def _bulk_write_in_batches(collection, operations: list):
+    for start in range(0, len(operations), PLAYER_STATS_BATCH_SIZE):
+        await collection.bulk_write(operations[start:start + PLAYER_STATS_BATCH_SIZE], ordered=False)
+
+async def rebuild_player_stats(player_id: Optional[str] = None, academy_id: Optional[str] = None) -> int:
+    """Regenerate player_stats from attendance history (live and archived); returns players written"""
+    projection = {"_id": 0, "player_id": 1, "academy_id": 1, "date": 1, "present": 1, **{f: 1 for f in RATINGS_FIELDS}}
+    now = datetime.utcnow()
+    
+    written = 0
+    for query in await attendance_history_scopes(academy_id, player_id):
+        totals: Dict[str, Dict[str, float]] = {}
+        academies: Dict[str, str] = {}
+        async for record in iter_attendance_history(query, projection):
+            academies[record["player_id"]] = record["academy_id"]
+            merge_increments(totals.setdefault(record["player_id"], {}), attendance_contribution(record))
+        
+        if player_id and academy_id and player_id not in totals:
+            # No history yet: an empty rollup still saves the next read a rebuild
+            totals[player_id] = {"total_sessions": 0, "attended_sessions": 0}
+            academies[player_id] = academy_id
+        
+        await _bulk_write_in_batches(db.player_stats, [
+            ReplaceOne(
+                {"player_id": stats_player},
+                {"player_id": stats_player, "academy_id": academies[stats_player], "updated_at": now, **_nest_fields(increments)},
+                upsert=True
+            )
+            for stats_player, increments in totals.items()
+        ])
+        written += len(totals)
+    return written
+
+async def get_player_stats(player_id: str, academy_id: str) -> Dict[str, Any]:
+    """Read a player's rollup, rebuilding it from history when missing"""
+    stats = await db.player_stats.find_one({"player_id": player_id, "academy_id": academy_id})
+    if stats is None:
+        await rebuild_player_stats(player_id=player_id, academy_id=academy_id)
+        stats = await db.player_stats.find_one({"player_id": player_id, "academy_id": academy_id})
+    return stats
+
+async def apply_player_stats_deltas(academy_id: str, deltas: Dict[str, Dict[str, float]]):
+    """$inc each player's rollup; players without a rollup are rebuilt on first read"""
+    now = datetime.utcnow()
+    operations = [
+        UpdateOne(
+            {"player_id": player_id, "academy_id": academy_id},
+            {"$inc": increments, "$set": {"updated_at": now}}
+        )
+        for player_id, increments in deltas.items()
+        if any(increments.values())
+    ]
+    if operations:
+        await db.player_stats.bulk_write(operations, ordered=False)
+
+# attendance_monthly holds one row per (academy_id, month, player_id) with the
+# numbers attendance summaries are built from:
+#   total_records / present_records
+#   rating_sum / rating_count                  session ratings (mean of a present record's ratings)
+#   categories: {<category>: {sum, count}}     every rating of present records
+# Writes keep it current with upserted $inc; reads only trust it once a full
+# backfill (`python server.py rebuild-attendance-monthly`) has been recorded.
+
+ATTENDANCE_MONTHLY_STATE_ID = "attendance_monthly"
+_attendance_monthly_ready = False
+
+def _is_rating(value) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+def attendance_monthly_contribution(record: Dict[str, Any], sign: int = 1) -> Dict[str, float]:
+    """$inc deltas that one attendance record adds to its monthly row"""
+    inc = {"total_records": sign}
+    if record.get("present"):
+        inc["present_records"] = sign
+        ratings = {k: v for k, v in decode_performance_ratings(record).items() if _is_rating(v)}
+        if ratings:
+            inc["rating_sum"] = sign * sum(ratings.values()) / len(ratings)
+            inc["rating_count"] = sign
+        for category, rating in ratings.items():
+            if _is_rollup_key(category):
+                inc[f"categories.{category}.sum"] = sign * rating
+                inc[f"categories.{category}.count"] = sign
+    return inc
+
+async def apply_attendance_monthly_deltas(academy_id: str, deltas: Dict[Tuple[str, str], Dict[str, float]]):
+    """Upsert $inc into the monthly rows keyed by (month, player_id)"""
+    now = datetime.utcnow()
+    operations = [
+        UpdateOne(
+            {"academy_id": academy_id, "month": month, "player_id": player_id},
+            {"$inc": increments, "$set": {"updated_at": now}},
+            upsert=True
+        )
+        for (month, player_id), increments in deltas.items()
+        if any(increments.values())
+    ]
+    if not operations:
+        return
+    try:
+        await db.attendance_monthly.bulk_write(operations, ordered=False)
+    except BulkWriteError as e:
+        # Same race as attendance upserts: the loser retries as an update
+        write_errors = e.details.get("writeErrors", [])
+        if any(error.get("code") != 11000 for error in write_errors):
+            raise
+        await db.attendance_monthly.bulk_write(
+            [operations[error["index"]] for error in write_errors], ordered=False
+        )
+
+async def rebuild_attendance_monthly(academy_id: Optional[str] = None) -> int:
+    """Regenerate attendance_monthly from attendance history (live and archived); returns rows written.
+
+    Meant to run offline: writes landing between a row being read and
+    replaced are overwritten.
+    """
+    projection = {"_id": 0, "player_id": 1, "academy_id": 1, "date": 1, "present": 1, **{f: 1 for f in RATINGS_FIELDS}}
+    started_at = datetime.utcnow()
+    
+    written = 0
+    for query in await attendance_history_scopes(academy_id):
+        totals: Dict[Tuple[str, str, str], Dict[str, float]] = {}
+        async for record in iter_attendance_history(query, projection):
+            key = (record["academy_id"], record["date"][:7], record["player_id"])
+            merge_increments(totals.setdefault(key, {}), attendance_monthly_contribution(record))
+        
+        await _bulk_write_in_batches(db.attendance_monthly, [
+            ReplaceOne(
+                {"academy_id": row_academy, "month": row_month, "player_id": row_player},
+                {"academy_id": row_academy, "month": row_month, "player_id": row_player,
+                 "updated_at": started_at, **_nest_fields(increments)},
+                upsert=True
+            )
+            for (row_academy, row_month, row_player), increments in totals.items()
+        ])
+        written += len(totals)
+    
+    # Rows not rewritten (and not touched by live writes since) have no source left
+    await db.attendance_monthly.delete_many({**without_none(academy_id=academy_id), "updated_at": {"$lt": started_at}})
+    if academy_id is None:
+        await db.rollup_state.update_one(
+            {"_id": ATTENDANCE_MONTHLY_STATE_ID}, {"$set": {"built_at": started_at}}, upsert=True
+        )
+    return written
+
+async def attendance_monthly_ready() -> bool:
+    """Whether a full backfill has run, so the monthly rows can serve reads"""
+    global _attendance_monthly_ready
+    if not _attendance_monthly_ready:
+        _attendance_monthly_ready = await db.rollup_state.count_documents(
+            {"_id": ATTENDANCE_MONTHLY_STATE_ID}, limit=1
+        ) > 0
+    return _attendance_monthly_ready
+
+async def migrate_performance_ratings(academy_id: Optional[str] = None) -> int:
+    """Rewrite attendance ratings into the current columnar schema; returns records converted.
+
+    Applies to the document layout; records are encoded when moved into buckets.
+    """
+    query = {**without_none(academy_id=academy_id), "ratings_schema": {"$ne": RATINGS_SCHEMA_VERSION}}
+    converted = 0
+    operations = []
+    async for record in db.player_attendance.find(query, {"_id": 1, **{f: 1 for f in RATINGS_FIELDS}}):
+        operations.append(UpdateOne(
+            # Skip records a live write has already stored in the new layout
+            {"_id": record["_id"], "ratings_schema": {"$ne": RATINGS_SCHEMA_VERSION}},
+            {"$set": encode_performance_ratings(record.get("sport"), decode_performance_ratings(record))}
+        ))
+        if len(operations) >= PLAYER_STATS_BATCH_SIZE:
+            converted += (await db.player_attendance.bulk_write(operations, ordered=False)).modified_count
+            operations.clear()
+    if operations:
+        converted += (await db.player_attendance.bulk_write(operations, ordered=False)).modified_count
+    return converted
+
 # ========== ATTENDANCE AND PERFORMANCE TRACKING ENDPOINTS ==========
 
 # Mark attendance for players (Academy User)
@@ -2155,54 +4008,83 @@ async def mark_attendance(attendance_request: AttendanceMarkingRequest, user_inf
         academy_id = user_info["academy_id"]
         marked_by = user_info["user"].id
         
-        results = []
+        # Last record wins when the same player/date is submitted twice
+        records = {}
         for record in attendance_request.attendance_records:
-            # Validate player belongs to academy
-            player = await db.players.find_one({"id": record.player_id, "academy_id": academy_id})
-            if not player:
-                continue  # Skip invalid players
-            
-            # Check if attendance already exists for this date
-            existing_attendance = await db.player_attendance.find_one({
-                "player_id": record.player_id,
+            records[(record.player_id, record.date)] = record
+        records = list(records.values())
+        
+        # Validate all players belong to academy in one query
+        players_cursor = db.players.find(
+            {"academy_id": academy_id, "id": {"$in": list({r.player_id for r in records})}},
+            {"_id": 0, "id": 1, "sport": 1}
+        )
+        player_sports = {p["id"]: p.get("sport", "Other") async for p in players_cursor}
+        records = [r for r in records if r.player_id in player_sports]  # Skip invalid players
+        
+        now = datetime.utcnow()
+        # Each write returns the record it replaced, so concurrent marks of the
+        # same day move the rollups by exactly what they changed
+        previous_states = await attendance_storage.upsert_records(
+            academy_id,
+            [
+                (record.player_id, record.date, {
+                    "present": record.present,
+                    "sport": record.sport or player_sports[record.player_id],
+                    **encode_performance_ratings(record.sport or player_sports[record.player_id], record.performance_ratings),
+                    "notes": record.notes,
+                    "marked_by": marked_by,
+                    "updated_at": now
+                })
+                for record in records
+            ],
+            now=now
+        )
+        previous_records = {
+            (record.player_id, record.date): previous
+            for record, previous in zip(records, previous_states)
+            if previous is not None
+        }
+        
+        results = [
+            {"player_id": record.player_id, "status": "updated" if previous is not None else "created"}
+            for record, previous in zip(records, previous_states)
+        ]
+        
+        # Creating an archived day: the archived copy is what the rollups counted
+        pending_keys = {(r.player_id, r.date) for r in records} - set(previous_records)
+        if pending_keys:
+            archive_cursor = db.attendance_archive.find({
                 "academy_id": academy_id,
-                "date": record.date
+                "player_id": {"$in": list({player for player, _ in pending_keys})},
+                "month": {"$in": list({date[:7] for _, date in pending_keys})}
             })
-            
-            # Get player's sport for performance categories
-            player_sport = player.get("sport", "Other")
-            
-            attendance_data = {
-                "player_id": record.player_id,
-                "academy_id": academy_id,
+            async for blob in archive_cursor:
+                for record in decompress_archive_records(blob):
+                    if (blob["player_id"], record["date"]) in pending_keys:
+                        previous_records[(blob["player_id"], record["date"])] = record
+        
+        # Move the rollups by (new - previous) contributions
+        stats_deltas: Dict[str, Dict[str, float]] = {}
+        monthly_deltas: Dict[Tuple[str, str], Dict[str, float]] = {}
+        for record in records:
+            written = {
                 "date": record.date,
                 "present": record.present,
-                "sport": record.sport or player_sport,  # Use provided sport or player's sport
-                "performance_ratings": record.performance_ratings or {},
-                "notes": record.notes,
-                "marked_by": marked_by,
-                "created_at": datetime.utcnow(),
-                "id": str(uuid.uuid4())
+                "performance_ratings": record.performance_ratings or {}
             }
-            
-            if existing_attendance:
-                # Update existing attendance
-                await db.player_attendance.update_one(
-                    {"id": existing_attendance["id"]},
-                    {"$set": {
-                        "present": record.present,
-                        "sport": record.sport or player_sport,
-                        "performance_ratings": record.performance_ratings or {},
-                        "notes": record.notes,
-                        "marked_by": marked_by,
-                        "updated_at": datetime.utcnow()
-                    }}
-                )
-                results.append({"player_id": record.player_id, "status": "updated"})
-            else:
-                # Create new attendance record
-                await db.player_attendance.insert_one(attendance_data)
-                results.append({"player_id": record.player_id, "status": "created"})
+            increments = stats_deltas.setdefault(record.player_id, {})
+            monthly_increments = monthly_deltas.setdefault((record.date[:7], record.player_id), {})
+            previous = previous_records.get((record.player_id, record.date))
+            if previous:
+                merge_increments(increments, attendance_contribution(previous, sign=-1))
+                merge_increments(monthly_increments, attendance_monthly_contribution(previous, sign=-1))
+            merge_increments(increments, attendance_contribution(written))
+            merge_increments(monthly_increments, attendance_monthly_contribution(written))
+        await asyncio.gather(
+            apply_player_stats_deltas(academy_id, stats_deltas),
+            apply_attendance_monthly_deltas(academy_id, monthly_deltas)
+        )
         
         return {"message": "Attendance marked successfully", "results": results}
         
@@ -2213,33 +4095,46 @@ async def mark_attendance(attendance_request: AttendanceMarkingRequest, user_inf
         raise HTTPException(status_code=500, detail="Failed to mark attendance")
 
 # Get attendance for a specific date (Academy User)
+# Also served as GET (registered after /academy/attendance/summary so the
+# path parameter does not shadow it)
 @api_router.post("/academy/attendance/{date}")
-async def get_attendance_by_date(date: str, user_info = Depends(require_academy_user)):
-    """Get attendance records for a specific date"""
+async def get_attendance_by_date(
+    date: str,
+    player_ids: Optional[List[str]] = Query(None),
+    user_info = Depends(require_academy_user)
+):
+    """Get attendance records for a specific date, optionally for specific players"""
     try:
         academy_id = user_info["academy_id"]
         
-        # Get attendance records for the date
-        attendance_cursor = db.player_attendance.find({
-            "academy_id": academy_id,
-            "date": date
-        })
-        attendance_records = await attendance_cursor.to_list(length=None)
-        
-        # Get player details for each attendance record
-        results = []
-        for record in attendance_records:
-            player = await db.players.find_one({"id": record["player_id"]})
-            if player:
-                results.append({
-                    "attendance_id": record["id"],
-                    "player_id": record["player_id"],
-                    "player_name": f"{player['first_name']} {player['last_name']}",
-                    "present": record["present"],
-                    "performance_ratings": record.get("performance_ratings", {}),
-                    "notes": record.get("notes"),
-                    "marked_at": record["created_at"]
-                })
+        attendance_filter = {"academy_id": academy_id, "date": date}
+        if player_ids:
+            attendance_filter["player_id"] = {"$in": player_ids}
+        
+        # Join player names in the same round trip
+        pipeline = [
+            {"$lookup": {
+                "from": "players",
+                "localField": "player_id",
+                "foreignField": "id",
+                "pipeline": [{"$project": {"_id": 0, "first_name": 1, "last_name": 1}}],
+                "as": "player"
+            }},
+            {"$unwind": "$player"},  # Records whose player no longer exists are dropped
+            {"$project": {
+                "_id": 0,
+                "attendance_id": "$id",
+                "player_id": 1,
+                "player_name": {"$concat": [
+                    {"$ifNull": ["$player.first_name", ""]}, " ", {"$ifNull": ["$player.last_name", ""]}
+                ]},
+                "present": 1,
+                "performance_ratings": {"$arrayToObject": RATINGS_PAIRS_EXPRESSION},
+                "notes": {"$ifNull": ["$notes", None]},
+                "marked_at": "$created_at"
+            }}
+        ]
+        results = await attendance_storage.aggregate(attendance_filter, pipeline).to_list(length=None)
         
         return {"date": date, "attendance_records": results}
         
@@ -2260,44 +4155,53 @@ async def get_player_performance(player_id: str, user_info = Depends(require_aca
         if not player:
             raise HTTPException(status_code=404, detail="Player not found")
         
-        all_sessions_cursor = db.player_attendance.find({"player_id": player_id, "academy_id": academy_id})
-        all_sessions = await all_sessions_cursor.to_list(length=None)
-
-        total_sessions = len(all_sessions)
-        attended_sessions_records = [s for s in all_sessions if s.get("present")]
-        attended_sessions = len(attended_sessions_records)
-        attendance_percentage = (attended_sessions / total_sessions * 100) if total_sessions > 0 else 0
-        
-        all_ratings = [
-            record.get("performance_ratings", {}).get("overall")
-            for record in attended_sessions_records
-            if record.get("performance_ratings", {}).get("overall") is not None
-        ]
-        average_rating = round(sum(all_ratings) / len(all_ratings), 2) if all_ratings else None
-        
-        performance_trend = sorted([
-            {"date": record["date"], "rating": record.get("performance_ratings", {}).get("overall")}
-            for record in attended_sessions_records
-            if record.get("performance_ratings", {}).get("overall") is not None
-        ], key=lambda x: x["date"])
-        
+        # Totals and monthly buckets come from the maintained rollup; only the
+        # rated trend is read from attendance (live and archived)
+        stats, performance_trend, archived = await asyncio.gather(
+            get_player_stats(player_id, academy_id),
+            attendance_storage.aggregate(
+                {
+                    "player_id": player_id,
+                    "academy_id": academy_id,
+                    "present": True,
+                    "$or": [
+                        {"performance_ratings_extra.overall": {"$ne": None}},
+                        {"performance_ratings.overall": {"$ne": None}}
+                    ]
+                },
+                [{"$sort": {"date": 1}},
+                {"$project": {
+                    "_id": 0,
+                    "date": 1,
+                    "rating": {"$ifNull": ["$performance_ratings_extra.overall", "$performance_ratings.overall"]}
+                }}]
+            ).to_list(length=None),
+            archived_player_records(player_id, academy_id)
+        )
+        for record in archived:
+            rating = decode_performance_ratings(record).get("overall")
+            if record.get("present") and rating is not None:
+                performance_trend.append({"date": record["date"], "rating": rating})
+        if archived:
+            performance_trend.sort(key=lambda point: point["date"])
+        
+        total_sessions = stats.get("total_sessions", 0)
+        attended_sessions = stats.get("attended_sessions", 0)
+        overall = stats.get("overall", {})
         monthly_stats = {}
-        for record in all_sessions:
-            month_key = record["date"][:7]
-            if month_key not in monthly_stats:
-                monthly_stats[month_key] = {"total_sessions": 0, "attended_sessions": 0, "ratings": []}
-            
-            monthly_stats[month_key]["total_sessions"] += 1
-            if record.get("present"):
-                monthly_stats[month_key]["attended_sessions"] += 1
-                rating = record.get("performance_ratings", {}).get("overall")
-                if rating is not None:
-                    monthly_stats[month_key]["ratings"].append(rating)
-        
-        for month, stats in monthly_stats.items():
-            stats["attendance_percentage"] = (stats["attended_sessions"] / stats["total_sessions"] * 100) if stats["total_sessions"] > 0 else 0
-            stats["average_rating"] = round(sum(stats["ratings"]) / len(stats["ratings"]), 2) if stats["ratings"] else None
-            del stats["ratings"]
+        for month_key, month in sorted(stats.get("months", {}).items()):
+            if not month.get("total_sessions"):
+                continue
+            rating_count = month.get("rating_count", 0)
+            monthly_stats[month_key] = {
+                "total_sessions": month["total_sessions"],
+                "attended_sessions": month.get("attended_sessions", 0),
+                "attendance_percentage": month.get("attended_sessions", 0) / month["total_sessions"] * 100,
+                "average_rating": round(month["rating_sum"] / rating_count, 2) if rating_count else None
+            }
+        
+        attendance_percentage = (attended_sessions / total_sessions * 100) if total_sessions > 0 else 0
+        average_rating = round(overall["sum"] / overall["count"], 2) if overall.get("count") else None
 
         return PlayerPerformanceAnalytics(
             player_id=player_id,
@@ -2319,12 +4223,212 @@ async def get_player_performance(player_id: str, user_info = Depends(require_aca
 
 
 # Get attendance summary for academy (Academy User)
+ATTENDANCE_SUMMARY_BREAKDOWNS = ["day", "player", "category"]
+
+def _attendance_counts_group(group_key) -> Dict[str, Any]:
+    """$group stage counting records, present records and rated sessions"""
+    return {"$group": {
+        "_id": group_key,
+        "total_records": {"$sum": 1},
+        "present_records": {"$sum": {"$cond": [{"$eq": ["$present", True]}, 1, 0]}},
+        "rating_sum": {"$sum": "$session_rating"},
+        "rating_count": {"$sum": {"$cond": [{"$ne": ["$session_rating", None]}, 1, 0]}}
+    }}
+
+def _monthly_counts_group(group_key) -> Dict[str, Any]:
+    """Same totals as _attendance_counts_group, summed from attendance_monthly rows"""
+    return {"$group": {
+        "_id": group_key,
+        "total_records": {"$sum": "$total_records"},
+        "present_records": {"$sum": "$present_records"},
+        "rating_sum": {"$sum": "$rating_sum"},
+        "rating_count": {"$sum": "$rating_count"}
+    }}
+
+_PLAYER_NAME_LOOKUP = {"$lookup": {
+    "from": "players",
+    "localField": "_id",
+    "foreignField": "id",
+    "pipeline": [{"$project": {"_id": 0, "first_name": 1, "last_name": 1}}],
+    "as": "player"
+}}
+
+def _attendance_summary_stages(breakdowns: List[str]) -> List[Dict[str, Any]]:
+    """Summary facets computed from raw attendance records"""
+    # A session's rating is the mean of its category ratings (present only)
+    facets = {"totals": [_attendance_counts_group(None)]}
+    if "day" in breakdowns:
+        facets["by_day"] = [_attendance_counts_group("$date"), {"$sort": {"_id": 1}}]
+    if "player" in breakdowns:
+        facets["by_player"] = [_attendance_counts_group("$player_id"), _PLAYER_NAME_LOOKUP, {"$sort": {"_id": 1}}]
+    if "category" in breakdowns:
+        facets["by_category"] = [
+            {"$match": {"present": True}},
+            {"$project": {"rating": "$ratings"}},
+            {"$unwind": "$rating"},
+            {"$match": {"rating.v": {"$type": "number"}}},
+            {"$group": {"_id": "$rating.k", "rating_sum": {"$sum": "$rating.v"}, "rating_count": {"$sum": 1}}},
+            {"$sort": {"_id": 1}}
+        ]
+    return [
+        {"$project": {
+            "date": 1,
+            "player_id": 1,
+            "present": 1,
+            "ratings": RATINGS_PAIRS_EXPRESSION
+        }},
+        {"$addFields": {
+            "session_rating": {"$cond": [{"$eq": ["$present", True]}, {"$avg": "$ratings.v"}, None]}
+        }},
+        {"$facet": facets}
+    ]
+
+def _monthly_summary_pipeline(match: Dict[str, Any], breakdowns: List[str]) -> List[Dict[str, Any]]:
+    """Summary facets (except by_day) computed from attendance_monthly rows"""
+    facets = {"totals": [_monthly_counts_group(None)]}
+    if "player" in breakdowns:
+        facets["by_player"] = [_monthly_counts_group("$player_id"), _PLAYER_NAME_LOOKUP, {"$sort": {"_id": 1}}]
+    if "category" in breakdowns:
+        facets["by_category"] = [
+            {"$project": {"rating": {"$objectToArray": {"$ifNull": ["$categories", {}]}}}},
+            {"$unwind": "$rating"},
+            {"$group": {"_id": "$rating.k", "rating_sum": {"$sum": "$rating.v.sum"}, "rating_count": {"$sum": "$rating.v.count"}}},
+            {"$match": {"rating_count": {"$gt": 0}}},
+            {"$sort": {"_id": 1}}
+        ]
+    return [{"$match": match}, {"$facet": facets}]
+
+def _merge_summary_facets(*results: Dict[str, List[Dict[str, Any]]]) -> Dict[str, List[Dict[str, Any]]]:
+    """Add up facet rows that share an _id across several summary results"""
+    merged: Dict[str, Dict[Any, Dict[str, Any]]] = {}
+    for result in results:
+        for facet, rows in result.items():
+            by_id = merged.setdefault(facet, {})
+            for row in rows:
+                entry = by_id.setdefault(row["_id"], {"_id": row["_id"]})
+                for key, value in row.items():
+                    if _is_rating(value):
+                        entry[key] = entry.get(key, 0) + value
+                    elif key != "_id":
+                        entry.setdefault(key, value)
+    return {
+        facet: [by_id[key] for key in sorted(by_id, key=lambda k: (k is None, k))]
+        for facet, by_id in merged.items()
+    }
+
+def _shift_month(month: str, delta: int) -> str:
+    year, month_number = map(int, month.split("-"))
+    index = year * 12 + month_number - 1 + delta
+    return f"{index // 12:04d}-{index % 12 + 1:02d}"
+
+def _split_summary_range(start_date: Optional[str], end_date: Optional[str]):
+    """Split a date range into whole months and the partial-month edges.
+
+    Returns ``(month_range, edge_ranges)`` - a ``month`` condition for
+    attendance_monthly and ``date`` conditions still read from attendance -
+    or None when the range covers no whole month.
+    """
+    try:
+        first_month = last_month = None
+        if start_date:
+            if len(start_date) != 10:
+                return None
+            start = datetime.strptime(start_date, "%Y-%m-%d")
+            first_month = start_date[:7] if start.day == 1 else _shift_month(start_date[:7], 1)
+        if end_date:
+            if len(end_date) != 10:
+                return None
+            end = datetime.strptime(end_date, "%Y-%m-%d")
+            last_month = end_date[:7] if (end + timedelta(days=1)).day == 1 else _shift_month(end_date[:7], -1)
+    except ValueError:
+        return None
+    if first_month and last_month and first_month > last_month:
+        return None
+    
+    month_range, edge_ranges = {}, []
+    if first_month:
+        month_range["$gte"] = first_month
+        if start_date < first_month:
+            edge_ranges.append({"$gte": start_date, "$lt": first_month})
+    if last_month:
+        month_range["$lte"] = last_month
+        next_month = _shift_month(last_month, 1)
+        if end_date >= next_month:
+            edge_ranges.append({"$gte": next_month, "$lte": end_date})
+    return month_range, edge_ranges
+
+def _edge_bounds(edge_range: Dict[str, str]) -> Tuple[str, str]:
+    """Inclusive (start, end) dates of an edge range from _split_summary_range"""
+    if "$lte" in edge_range:
+        return edge_range["$gte"], edge_range["$lte"]
+    last_day = datetime.strptime(f"{edge_range['$lt']}-01", "%Y-%m-%d") - timedelta(days=1)
+    return edge_range["$gte"], last_day.strftime("%Y-%m-%d")
+
+async def _archived_summary_facets(academy_id: str, start_date: Optional[str], end_date: Optional[str],
+                                   breakdowns: List[str]) -> Dict[str, List[Dict[str, Any]]]:
+    """Summary facets over archived records, shaped like _attendance_summary_stages output"""
+    groups: Dict[str, Dict[Any, Dict[str, float]]] = {"totals": {}, "by_day": {}, "by_player": {}, "by_category": {}}
+    async for record in unshadowed_archived_records(academy_id, start_date, end_date):
+        counts = {"total_records": 0, "present_records": 0, "rating_sum": 0, "rating_count": 0}
+        for field, value in attendance_monthly_contribution(record).items():
+            if field.startswith("categories."):
+                _, category, stat = field.split(".")
+                merge_increments(groups["by_category"].setdefault(category, {}), {f"rating_{stat}": value})
+            else:
+                counts[field] += value
+        merge_increments(groups["totals"].setdefault(None, {}), counts)
+        merge_increments(groups["by_day"].setdefault(record["date"], {}), counts)
+        merge_increments(groups["by_player"].setdefault(record["player_id"], {}), counts)
+    
+    facets = {"totals": [{"_id": key, **counts} for key, counts in groups["totals"].items()]}
+    if "day" in breakdowns:
+        facets["by_day"] = [{"_id": key, **counts} for key, counts in groups["by_day"].items()]
+    if "player" in breakdowns:
+        names = {
+            player["id"]: player
+            async for player in db.players.find(
+                {"id": {"$in": list(groups["by_player"])}}, {"_id": 0, "id": 1, "first_name": 1, "last_name": 1}
+            )
+        } if groups["by_player"] else {}
+        facets["by_player"] = [
+            {"_id": key, **counts, "player": [names[key]] if key in names else []}
+            for key, counts in groups["by_player"].items()
+        ]
+    if "category" in breakdowns:
+        facets["by_category"] = [{"_id": key, **counts} for key, counts in groups["by_category"].items()]
+    return facets
+
+def _attendance_counts_summary(counts: Dict[str, Any]) -> Dict[str, Any]:
+    total_records = counts.get("total_records", 0)
+    present_records = counts.get("present_records", 0)
+    rating_count = counts.get("rating_count", 0)
+    return {
+        "total_records": total_records,
+        "present_records": present_records,
+        "attendance_rate": round(present_records / total_records * 100, 2) if total_records else 0,
+        "average_performance_rating": round(counts["rating_sum"] / rating_count, 2) if rating_count else None,
+        "total_performance_ratings": rating_count
+    }
+
 @api_router.get("/academy/attendance/summary")
-async def get_attendance_summary(start_date: str = None, end_date: str = None, user_info = Depends(require_academy_user)):
-    """Get attendance summary for academy within date range"""
+async def get_attendance_summary(
+    start_date: str = None,
+    end_date: str = None,
+    breakdown: Optional[List[str]] = Query(None),
+    user_info = Depends(require_academy_user)
+):
+    """Get attendance summary for academy within date range.
+
+    ``breakdown`` may request any of ``day``, ``player`` and ``category``.
+    """
     try:
         academy_id = user_info["academy_id"]
         
+        breakdowns = breakdown or []
+        invalid = [b for b in breakdowns if b not in ATTENDANCE_SUMMARY_BREAKDOWNS]
+        if invalid:
+            raise HTTPException(status_code=400, detail=f"Invalid breakdown: {', '.join(invalid)}")
+        
         # Build date filter
         date_filter = {"academy_id": academy_id}
         if start_date and end_date:
@@ -2334,47 +4438,105 @@ async def get_attendance_summary(start_date: str = None, end_date: str = None, u
         elif end_date:
             date_filter["date"] = {"$lte": end_date}
         
-        # Get attendance records
-        attendance_cursor = db.player_attendance.find(date_filter)
-        attendance_records = await attendance_cursor.to_list(length=None)
-        
-        # Calculate summary statistics
-        total_records = len(attendance_records)
-        present_records = sum(1 for record in attendance_records if record["present"])
-        overall_attendance_rate = (present_records / total_records * 100) if total_records > 0 else 0
-        
-        # Get performance ratings
-        performance_ratings = [record.get("performance_rating") for record in attendance_records 
-                             if record.get("performance_rating") is not None and record["present"]]
-        average_performance = sum(performance_ratings) / len(performance_ratings) if performance_ratings else None
+        # Whole months come from attendance_monthly once it has been backfilled;
+        # partial-month edges and per-day breakdowns still read attendance.
+        # The raw reads add archived records, which the monthly rows include
+        split = None
+        if "day" not in breakdowns and await attendance_monthly_ready():
+            split = _split_summary_range(start_date, end_date)
+        
+        if split is None:
+            stages = _attendance_summary_stages(breakdowns)
+            live, archived = await asyncio.gather(
+                attendance_storage.aggregate(date_filter, stages).to_list(length=1),
+                _archived_summary_facets(academy_id, start_date, end_date, breakdowns)
+            )
+            result = _merge_summary_facets(live[0], archived)
+        else:
+            month_range, edge_ranges = split
+            month_filter = {"academy_id": academy_id}
+            if month_range:
+                month_filter["month"] = month_range
+            reads = [db.attendance_monthly.aggregate(_monthly_summary_pipeline(month_filter, breakdowns)).to_list(length=1)]
+            archived_reads = []
+            for edge_range in edge_ranges:
+                edge_filter = {"academy_id": academy_id, "date": edge_range}
+                reads.append(attendance_storage.aggregate(edge_filter, _attendance_summary_stages(breakdowns)).to_list(length=1))
+                archived_reads.append(_archived_summary_facets(academy_id, *_edge_bounds(edge_range), breakdowns))
+            results = await asyncio.gather(*reads, *archived_reads)
+            result = _merge_summary_facets(
+                *[facets[0] for facets in results[:len(reads)]], *results[len(reads):]
+            )
         
-        return {
+        totals = _attendance_counts_summary(result["totals"][0] if result["totals"] else {})
+        summary = {
             "date_range": {"start": start_date, "end": end_date},
-            "total_records": total_records,
-            "present_records": present_records,
-            "overall_attendance_rate": round(overall_attendance_rate, 2),
-            "average_performance_rating": round(average_performance, 2) if average_performance else None,
-            "total_performance_ratings": len(performance_ratings)
+            "total_records": totals["total_records"],
+            "present_records": totals["present_records"],
+            "overall_attendance_rate": totals["attendance_rate"],
+            "average_performance_rating": totals["average_performance_rating"],
+            "total_performance_ratings": totals["total_performance_ratings"]
         }
         
+        if breakdowns:
+            summary["breakdowns"] = {}
+        if "day" in breakdowns:
+            summary["breakdowns"]["day"] = [
+                {"date": day["_id"], **_attendance_counts_summary(day)} for day in result["by_day"]
+            ]
+        if "player" in breakdowns:
+            summary["breakdowns"]["player"] = [
+                {
+                    "player_id": entry["_id"],
+                    "player_name": f"{entry['player'][0].get('first_name', '')} {entry['player'][0].get('last_name', '')}" if entry["player"] else None,
+                    **_attendance_counts_summary(entry)
+                }
+                for entry in result["by_player"]
+            ]
+        if "category" in breakdowns:
+            summary["breakdowns"]["category"] = [
+                {
+                    "category": category["_id"],
+                    "average_rating": round(category["rating_sum"] / category["rating_count"], 2),
+                    "total_ratings": category["rating_count"]
+                }
+                for category in result["by_category"]
+            ]
+        
+        return summary
+        
     except HTTPException:
         raise
     except Exception as e:
         logger.error(f"Error fetching attendance summary: {e}")
         raise HTTPException(status_code=500, detail="Failed to fetch attendance summary")
 
+api_router.add_api_route("/academy/attendance/{date}", get_attendance_by_date, methods=["GET"])
+
 # ========== COACH MANAGEMENT ENDPOINTS ==========
 
 # Get all coaches for an academy (Academy User)
 @api_router.get("/academy/coaches", response_model=List[Coach])
-async def get_academy_coaches(user_info = Depends(require_academy_user)):
-    """Get all coaches for the authenticated academy"""
+async def get_academy_coaches(
+    response: Response,
+    status: Optional[str] = None,
+    specialization: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[str] = None,
+    user_info = Depends(require_academy_user)
+):
+    """Get coaches for the authenticated academy; all of them unless ``limit`` asks for keyset pages"""
     try:
         academy_id = user_info["academy_id"]
         
         # Get coaches for this academy
-        coaches_cursor = db.coaches.find({"academy_id": academy_id})
-        coaches = await coaches_cursor.to_list(length=None)
+        coaches, next_cursor = await paginate(
+            db.coaches,
+            without_none(academy_id=academy_id, status=status, specialization=specialization),
+            limit, after
+        )
+        if next_cursor:
+            response.headers[NEXT_CURSOR_HEADER] = next_cursor
         
         return [Coach(**coach) for coach in coaches]
         
@@ -2388,13 +4550,14 @@ async def get_academy_coaches(user_info = Depends(require_academy_user)):
 @api_router.post("/academy/coaches", response_model=Coach)
 async def create_coach(coach_data: CoachCreate, user_info = Depends(require_academy_user)):
     """Create a new coach for the authenticated academy"""
+    slot_reserved = False
     try:
         academy_id = user_info["academy_id"]
         academy = user_info["academy"]
         
-        # Check if academy has reached coach limit
-        current_coaches = await db.coaches.count_documents({"academy_id": academy_id, "status": "active"})
-        if current_coaches >= academy.get("coach_limit", 10):
+        # Reserve a coach slot against the plan limit (released below unless the insert succeeds)
+        slot_reserved = await reserve_academy_slot(academy_id, "coaches", academy.get("coach_limit", 10))
+        if not slot_reserved:
             raise HTTPException(
                 status_code=400,
                 detail=f"Academy has reached maximum coach limit of {academy.get('coach_limit', 10)}"
@@ -2406,8 +4569,10 @@ async def create_coach(coach_data: CoachCreate, user_info = Depends(require_acad
             **coach_data.dict()
         )
         
-        # Save to database
+        # Save to database; the reservation now accounts for this coach
         await db.coaches.insert_one(coach.dict())
+        slot_reserved = False
+        await bump_academy_data_version(user_info["academy_id"])
         
         return coach
         
@@ -2416,6 +4581,9 @@ async def create_coach(coach_data: CoachCreate, user_info = Depends(require_acad
     except Exception as e:
         logger.error(f"Error creating coach: {e}")
         raise HTTPException(status_code=500, detail="Failed to create coach")
+    finally:
+        if slot_reserved:
+            await release_academy_slot(user_info["academy_id"], "coaches")
 
 # Get specific coach (Academy User)
 @api_router.get("/academy/coaches/{coach_id}", response_model=Coach)
@@ -2444,23 +4612,22 @@ async def update_coach(coach_id: str, coach_data: CoachUpdate, user_info = Depen
     try:
         academy_id = user_info["academy_id"]
         
-        # Check if coach exists
-        existing_coach = await db.coaches.find_one({"id": coach_id, "academy_id": academy_id})
-        if not existing_coach:
-            raise HTTPException(status_code=404, detail="Coach not found")
-        
-        # Update coach data
+        # Update coach data; the pre-update document gives the previous status
         update_data = {k: v for k, v in coach_data.dict().items() if v is not None}
         update_data["updated_at"] = datetime.utcnow()
         
-        await db.coaches.update_one(
-            {"id": coach_id, "academy_id": academy_id},
-            {"$set": update_data}
+        existing_coach = await update_scoped_document(
+            db.coaches, coach_id, update_data, "Coach not found",
+            academy_id=academy_id, return_document=ReturnDocument.BEFORE
         )
+        await bump_academy_data_version(academy_id)
+        if "status" in update_data:
+            was_active = existing_coach.get("status") == "active"
+            await adjust_academy_counters(
+                academy_id, active_coaches=int(update_data["status"] == "active") - int(was_active)
+            )
         
-        # Get updated coach
-        updated_coach = await db.coaches.find_one({"id": coach_id, "academy_id": academy_id})
-        return Coach(**updated_coach)
+        return Coach(**{**existing_coach, **update_data})
         
     except HTTPException:
         raise
@@ -2481,7 +4648,12 @@ async def delete_coach(coach_id: str, user_info = Depends(require_academy_user))
             raise HTTPException(status_code=404, detail="Coach not found")
         
         # Delete coach
-        await db.coaches.delete_one({"id": coach_id, "academy_id": academy_id})
+        delete_result = await db.coaches.delete_one({"id": coach_id, "academy_id": academy_id})
+        if delete_result.deleted_count:
+            await adjust_academy_counters(
+                academy_id, total_coaches=-1, active_coaches=-int(existing_coach.get("status") == "active")
+            )
+            await bump_academy_data_version(academy_id)
         
         return {"message": "Coach deleted successfully"}
         
@@ -2491,6 +4663,114 @@ async def delete_coach(coach_id: str, user_info = Depends(require_academy_user))
         logger.error(f"Error deleting coach: {e}")
         raise HTTPException(status_code=500, detail="Failed to delete coach")
 
+# ========== DATA EXPORT ENDPOINTS ==========
+
+# Exportable datasets: collection, exported fields (in column order) and sort
+EXPORT_DATASETS = {
+    "players": {
+        "collection": "players",
+        "fields": [
+            "id", "first_name", "last_name", "email", "phone", "date_of_birth", "age", "gender",
+            "sport", "position", "registration_number", "height", "weight", "training_days",
+            "training_batch", "emergency_contact_name", "emergency_contact_phone", "medical_notes",
+            "status", "created_at", "updated_at"
+        ],
+        "sort": [("created_at", ASCENDING), ("id", ASCENDING)]
+    },
+    "coaches": {
+        "collection": "coaches",
+        "fields": [
+            "id", "first_name", "last_name", "email", "phone", "specialization", "experience_years",
+            "qualifications", "salary", "hire_date", "contract_end_date", "emergency_contact_name",
+            "emergency_contact_phone", "status", "created_at", "updated_at"
+        ],
+        "sort": [("created_at", ASCENDING), ("id", ASCENDING)]
+    },
+    "attendance": {
+        "collection": "player_attendance",
+        "fields": [
+            "id", "player_id", "date", "present", "sport", "performance_ratings",
+            "notes", "marked_by", "created_at", "updated_at"
+        ],
+        "sort": [("date", ASCENDING), ("player_id", ASCENDING)],
+        # Stored fields read alongside "fields", and how a document becomes a row
+        "read_fields": RATINGS_FIELDS,
+        "decode": decode_attendance_document
+    }
+}
+EXPORT_BATCH_SIZE = 500
+
+def _export_value(value):
+    """Render a field for NDJSON/CSV output"""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+def _csv_cell(value):
+    value = _export_value(value)
+    if isinstance(value, (dict, list)):
+        return json.dumps(value)
+    return "" if value is None else value
+
+async def _export_rows(cursor, fields: List[str], export_format: str, decode=None):
+    """Yield the export in chunks of EXPORT_BATCH_SIZE rows; memory stays constant"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer) if export_format == "csv" else None
+    if writer:
+        writer.writerow(fields)
+    rows = 0
+    async for document in cursor:
+        if decode:
+            document = decode(document)
+        if writer:
+            writer.writerow([_csv_cell(document.get(field)) for field in fields])
+        else:
+            buffer.write(json.dumps({field: _export_value(document.get(field)) for field in fields}, default=str))
+            buffer.write("\n")
+        rows += 1
+        if rows % EXPORT_BATCH_SIZE == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+# Stream an academy dataset as NDJSON or CSV (Academy User)
+@api_router.get("/academy/export/{dataset}")
+async def export_academy_data(
+    dataset: str,
+    export_format: str = Query("ndjson", alias="format", pattern="^(ndjson|csv)$"),
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    user_info = Depends(require_academy_user)
+):
+    """Export players, coaches or attendance (optionally within a date range)"""
+    config = EXPORT_DATASETS.get(dataset)
+    if not config:
+        raise HTTPException(status_code=404, detail=f"Unknown export dataset '{dataset}'")
+    
+    query = {"academy_id": user_info["academy_id"]}
+    if dataset == "attendance" and (start_date or end_date):
+        query["date"] = without_none(**{"$gte": start_date, "$lte": end_date})
+    
+    projection = {"_id": 0, **{field: 1 for field in config["fields"] + config.get("read_fields", [])}}
+    if dataset == "attendance":
+        # Archived months are merged in date order when the range reaches them
+        cursor = merge_archived_records(
+            attendance_storage.find(query, projection, sort=config["sort"], batch_size=EXPORT_BATCH_SIZE),
+            iter_archived_records(user_info["academy_id"], start_date=start_date, end_date=end_date)
+        )
+    else:
+        cursor = db[config["collection"]].find(query, projection).sort(config["sort"]).batch_size(EXPORT_BATCH_SIZE)
+    
+    media_type = "text/csv" if export_format == "csv" else "application/x-ndjson"
+    extension = "csv" if export_format == "csv" else "ndjson"
+    return StreamingResponse(
+        _export_rows(cursor, config["fields"], export_format, config.get("decode")),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{dataset}.{extension}"'}
+    )
+
 # ========== ACADEMY STATS ENDPOINT ==========
 
 # Get academy stats (Academy User)
@@ -2500,17 +4780,14 @@ async def get_academy_stats(user_info = Depends(require_academy_user)):
     try:
         academy_id = user_info["academy_id"]
         
-        # Count players and coaches
-        total_players = await db.players.count_documents({"academy_id": academy_id})
-        active_players = await db.players.count_documents({"academy_id": academy_id, "status": "active"})
-        total_coaches = await db.coaches.count_documents({"academy_id": academy_id})
-        active_coaches = await db.coaches.count_documents({"academy_id": academy_id, "status": "active"})
+        # Read maintained player and coach counters
+        counters = await get_academy_counters(academy_id)
         
         return {
-            "total_players": total_players,
-            "active_players": active_players,
-            "total_coaches": total_coaches,
-            "active_coaches": active_coaches,
+            "total_players": counters["total_players"],
+            "active_players": counters["active_players"],
+            "total_coaches": counters["total_coaches"],
+            "active_coaches": counters["active_coaches"],
             "player_limit": user_info["academy"].get("player_limit", 50),
             "coach_limit": user_info["academy"].get("coach_limit", 10)
         }
@@ -2657,15 +4934,13 @@ async def update_academy_settings(
         update_data = {k: v for k, v in settings_data.dict().items() if v is not None}
         update_data["updated_at"] = datetime.utcnow()
         
-        # Update settings using upsert
-        result = await db.academy_settings.update_one(
-            {"academy_id": academy_id},
-            {"$set": update_data},
-            upsert=True
+        # Update settings using upsert and return the result
+        updated_settings = await update_scoped_document(
+            db.academy_settings, None, update_data, "Academy settings not found",
+            academy_id=academy_id, upsert=True,
+            set_on_insert={"id": str(uuid.uuid4()), "created_at": update_data["updated_at"]}
         )
-        
-        # Get updated settings
-        updated_settings = await db.academy_settings.find_one({"academy_id": academy_id})
+        await bump_academy_data_version(academy_id)
         return AcademySettings(**updated_settings)
         
     except HTTPException:
@@ -2715,6 +4990,7 @@ async def upload_academy_logo(
             },
             upsert=True
         )
+        await bump_academy_data_version(academy_id)
         
         return {"logo_url": logo_url, "message": "Logo uploaded successfully"}
         
@@ -2773,172 +5049,188 @@ class AcademyAnalytics(BaseModel):
 
 # ========== ACADEMY ANALYTICS ENDPOINTS ==========
 
+def _bucket_counts(groups: List[Dict[str, Any]], initial: Optional[Dict[str, int]] = None) -> Dict[str, int]:
+    """Fold [{"_id": key, "count": n}] $group output into a distribution dict"""
+    distribution = dict(initial or {})
+    for group in groups:
+        distribution[group["_id"]] = distribution.get(group["_id"], 0) + group["count"]
+    return distribution
+
+async def _aggregate_player_analytics(academy_id: str, since: datetime) -> PlayerAnalytics:
+    """Build PlayerAnalytics for an academy in a single $facet aggregation"""
+    age = {"$ifNull": ["$age", 0]}
+    pipeline = [
+        {"$match": {"academy_id": academy_id}},
+        {"$facet": {
+            "status": [{"$group": {"_id": {"$ifNull": ["$status", "inactive"]}, "count": {"$sum": 1}}}],
+            "age": [{"$group": {
+                "_id": {"$switch": {
+                    "branches": [
+                        {"case": {"$lt": [age, 18]}, "then": "under_18"},
+                        {"case": {"$lte": [age, 25]}, "then": "18_25"}
+                    ],
+                    "default": "over_25"
+                }},
+                "count": {"$sum": 1}
+            }}],
+            "position": [{"$group": {"_id": {"$ifNull": ["$position", "Unknown"]}, "count": {"$sum": 1}}}],
+            "recent": [{"$match": {"created_at": {"$gte": since}}}, {"$count": "count"}]
+        }}
+    ]
+    facets = (await db.players.aggregate(pipeline).to_list(length=1))[0]
+    
+    status_distribution = _bucket_counts(facets["status"], {"active": 0, "inactive": 0})
+    total_players = sum(group["count"] for group in facets["status"])
+    active_players = status_distribution["active"]
+    
+    return PlayerAnalytics(
+        total_players=total_players,
+        active_players=active_players,
+        inactive_players=total_players - active_players,
+        age_distribution=_bucket_counts(facets["age"], {"under_18": 0, "18_25": 0, "over_25": 0}),
+        position_distribution=_bucket_counts(facets["position"]),
+        status_distribution=status_distribution,
+        recent_additions=facets["recent"][0]["count"] if facets["recent"] else 0
+    )
+
+async def _aggregate_coach_analytics(academy_id: str, since: datetime) -> CoachAnalytics:
+    """Build CoachAnalytics for an academy in a single $facet aggregation"""
+    experience = {"$ifNull": ["$experience_years", 0]}
+    pipeline = [
+        {"$match": {"academy_id": academy_id}},
+        {"$facet": {
+            "status": [{"$group": {"_id": {"$ifNull": ["$status", "inactive"]}, "count": {"$sum": 1}}}],
+            "specialization": [{"$group": {"_id": {"$ifNull": ["$specialization", "General"]}, "count": {"$sum": 1}}}],
+            "experience": [{"$group": {
+                "_id": {"$switch": {
+                    "branches": [
+                        {"case": {"$lte": [experience, 2]}, "then": "0_2_years"},
+                        {"case": {"$lte": [experience, 5]}, "then": "3_5_years"},
+                        {"case": {"$lte": [experience, 10]}, "then": "6_10_years"}
+                    ],
+                    "default": "over_10_years"
+                }},
+                "count": {"$sum": 1},
+                "total_experience": {"$sum": experience}
+            }}],
+            "recent": [{"$match": {"created_at": {"$gte": since}}}, {"$count": "count"}]
+        }}
+    ]
+    facets = (await db.coaches.aggregate(pipeline).to_list(length=1))[0]
+    
+    total_coaches = sum(group["count"] for group in facets["status"])
+    active_coaches = _bucket_counts(facets["status"]).get("active", 0)
+    total_experience = sum(group["total_experience"] for group in facets["experience"])
+    average_experience = total_experience / total_coaches if total_coaches > 0 else 0
+    
+    return CoachAnalytics(
+        total_coaches=total_coaches,
+        active_coaches=active_coaches,
+        inactive_coaches=total_coaches - active_coaches,
+        specialization_distribution=_bucket_counts(facets["specialization"]),
+        experience_distribution=_bucket_counts(
+            facets["experience"], {"0_2_years": 0, "3_5_years": 0, "6_10_years": 0, "over_10_years": 0}
+        ),
+        average_experience=round(average_experience, 1),
+        recent_additions=facets["recent"][0]["count"] if facets["recent"] else 0
+    )
+
 # Get comprehensive academy analytics (Academy User)
 @api_router.get("/academy/analytics", response_model=AcademyAnalytics)
 async def get_academy_analytics(user_info = Depends(require_academy_user)):
     """Get comprehensive analytics for the authenticated academy"""
     try:
-        academy_id = user_info["academy_id"]
-        academy_name = user_info["academy"]["name"]
-        
-        # Get players and coaches
-        players = await db.players.find({"academy_id": academy_id}).to_list(1000)
-        coaches = await db.coaches.find({"academy_id": academy_id}).to_list(100)
-        academy_data = await db.academies.find_one({"id": academy_id})
-        
-        # Calculate player analytics
-        total_players = len(players)
-        active_players = len([p for p in players if p.get("status") == "active"])
-        inactive_players = total_players - active_players
-        
-        # Age distribution
-        age_distribution = {"under_18": 0, "18_25": 0, "over_25": 0}
-        position_distribution = {}
-        status_distribution = {"active": 0, "inactive": 0}
-        
-        thirty_days_ago = datetime.utcnow() - timedelta(days=30)
-        recent_player_additions = 0
-        
-        for player in players:
-            # Age distribution
-            age = player.get("age", 0)
-            if age < 18:
-                age_distribution["under_18"] += 1
-            elif age <= 25:
-                age_distribution["18_25"] += 1
-            else:
-                age_distribution["over_25"] += 1
-            
-            # Position distribution
-            position = player.get("position", "Unknown")
-            position_distribution[position] = position_distribution.get(position, 0) + 1
-            
-            # Status distribution
-            status = player.get("status", "inactive")
-            status_distribution[status] = status_distribution.get(status, 0) + 1
-            
-            # Recent additions
-            created_at = player.get("created_at")
-            if created_at and isinstance(created_at, datetime) and created_at >= thirty_days_ago:
-                recent_player_additions += 1
-        
-        player_analytics = PlayerAnalytics(
-            total_players=total_players,
-            active_players=active_players,
-            inactive_players=inactive_players,
-            age_distribution=age_distribution,
-            position_distribution=position_distribution,
-            status_distribution=status_distribution,
-            recent_additions=recent_player_additions
-        )
-        
-        # Calculate coach analytics
-        total_coaches = len(coaches)
-        active_coaches = len([c for c in coaches if c.get("status") == "active"])
-        inactive_coaches = total_coaches - active_coaches
-        
-        specialization_distribution = {}
-        experience_distribution = {"0_2_years": 0, "3_5_years": 0, "6_10_years": 0, "over_10_years": 0}
-        total_experience = 0
-        recent_coach_additions = 0
-        
-        for coach in coaches:
-            # Specialization distribution
-            specialization = coach.get("specialization", "General")
-            specialization_distribution[specialization] = specialization_distribution.get(specialization, 0) + 1
-            
-            # Experience distribution
-            experience_years = coach.get("experience_years", 0)
-            total_experience += experience_years
-            
-            if experience_years <= 2:
-                experience_distribution["0_2_years"] += 1
-            elif experience_years <= 5:
-                experience_distribution["3_5_years"] += 1
-            elif experience_years <= 10:
-                experience_distribution["6_10_years"] += 1
-            else:
-                experience_distribution["over_10_years"] += 1
-            
-            # Recent additions
-            created_at = coach.get("created_at")
-            if created_at and isinstance(created_at, datetime) and created_at >= thirty_days_ago:
-                recent_coach_additions += 1
-        
-        average_experience = total_experience / total_coaches if total_coaches > 0 else 0
-        
-        coach_analytics = CoachAnalytics(
-            total_coaches=total_coaches,
-            active_coaches=active_coaches,
-            inactive_coaches=inactive_coaches,
-            specialization_distribution=specialization_distribution,
-            experience_distribution=experience_distribution,
-            average_experience=round(average_experience, 1),
-            recent_additions=recent_coach_additions
-        )
-        
-        # Calculate growth metrics (simplified for now)
-        monthly_player_growth = [{"month": "Current", "count": recent_player_additions}]
-        monthly_coach_growth = [{"month": "Current", "count": recent_coach_additions}]
-        yearly_summary = {"players_added": total_players, "coaches_added": total_coaches}
-        
-        growth_metrics = GrowthMetrics(
-            monthly_player_growth=monthly_player_growth,
-            monthly_coach_growth=monthly_coach_growth,
-            yearly_summary=yearly_summary
-        )
-        
-        # Calculate operational metrics
-        player_limit = academy_data.get("player_limit", 50)
-        coach_limit = academy_data.get("coach_limit", 10)
-        
-        player_capacity = (total_players / player_limit * 100) if player_limit > 0 else 0
-        coach_capacity = (total_coaches / coach_limit * 100) if coach_limit > 0 else 0
-        
-        academy_created = academy_data.get("created_at", datetime.utcnow())
-        academy_age = (datetime.utcnow() - academy_created).days if isinstance(academy_created, datetime) else 0
-        
-        # Check settings completion (simplified)
-        settings = await db.academy_settings.find_one({"academy_id": academy_id})
-        settings_filled = 0
-        total_settings = 10  # approximate number of key settings
-        
-        if settings:
-            key_fields = ["description", "website", "facility_address", "training_days", "training_time"]
-            settings_filled = sum(1 for field in key_fields if settings.get(field))
-        
-        settings_completion = (settings_filled / total_settings * 100)
-        
-        operational_metrics = OperationalMetrics(
-            capacity_utilization={"players": round(player_capacity, 1), "coaches": round(coach_capacity, 1)},
-            academy_age=academy_age,
-            settings_completion=round(settings_completion, 1),
-            recent_activity={"players_updated": recent_player_additions, "coaches_updated": recent_coach_additions}
-        )
-        
-        # Calculate summary metrics
-        total_members = total_players + total_coaches
-        monthly_growth_rate = ((recent_player_additions + recent_coach_additions) / max(total_members, 1)) * 100
-        capacity_usage = (player_capacity + coach_capacity) / 2
-        
-        return AcademyAnalytics(
-            academy_id=academy_id,
-            academy_name=academy_name,
-            player_analytics=player_analytics,
-            coach_analytics=coach_analytics,
-            growth_metrics=growth_metrics,
-            operational_metrics=operational_metrics,
-            total_members=total_members,
-            monthly_growth_rate=round(monthly_growth_rate, 1),
-            capacity_usage=round(capacity_usage, 1)
-        )
-        
+        return await get_cached_academy_analytics(user_info)
     except HTTPException:
         raise
     except Exception as e:
         logger.error(f"Error fetching academy analytics: {e}")
         raise HTTPException(status_code=500, detail="Failed to fetch academy analytics")
 
+async def get_cached_academy_analytics(user_info) -> AcademyAnalytics:
+    """AcademyAnalytics for the current academy data version, computed on a miss"""
+    academy_id = user_info["academy_id"]
+    # Read the version before computing: a write racing the computation then
+    # bumps past the key it is stored under
+    cache_key = (academy_id, await get_academy_data_version(academy_id))
+    analytics = analytics_cache.get(cache_key)
+    if analytics is None:
+        analytics = await compute_academy_analytics(academy_id, user_info["academy"]["name"])
+        analytics_cache.set(cache_key, analytics)
+    return analytics
+
+async def compute_academy_analytics(academy_id: str, academy_name: str) -> AcademyAnalytics:
+    """Build AcademyAnalytics from players, coaches, the academy and its settings"""
+    thirty_days_ago = datetime.utcnow() - timedelta(days=30)
+    
+    # The four reads are independent; run them concurrently
+    player_analytics, coach_analytics, academy_data, settings = await asyncio.gather(
+        _aggregate_player_analytics(academy_id, thirty_days_ago),
+        _aggregate_coach_analytics(academy_id, thirty_days_ago),
+        db.academies.find_one({"id": academy_id}),
+        db.academy_settings.find_one({"academy_id": academy_id})
+    )
+    
+    total_players = player_analytics.total_players
+    recent_player_additions = player_analytics.recent_additions
+    total_coaches = coach_analytics.total_coaches
+    recent_coach_additions = coach_analytics.recent_additions
+    
+    # Calculate growth metrics (simplified for now)
+    monthly_player_growth = [{"month": "Current", "count": recent_player_additions}]
+    monthly_coach_growth = [{"month": "Current", "count": recent_coach_additions}]
+    yearly_summary = {"players_added": total_players, "coaches_added": total_coaches}
+    
+    growth_metrics = GrowthMetrics(
+        monthly_player_growth=monthly_player_growth,
+        monthly_coach_growth=monthly_coach_growth,
+        yearly_summary=yearly_summary
+    )
+    
+    # Calculate operational metrics
+    player_limit = academy_data.get("player_limit", 50)
+    coach_limit = academy_data.get("coach_limit", 10)
+    
+    player_capacity = (total_players / player_limit * 100) if player_limit > 0 else 0
+    coach_capacity = (total_coaches / coach_limit * 100) if coach_limit > 0 else 0
+    
+    academy_created = academy_data.get("created_at", datetime.utcnow())
+    academy_age = (datetime.utcnow() - academy_created).days if isinstance(academy_created, datetime) else 0
+    
+    # Check settings completion (simplified)
+    settings_filled = 0
+    total_settings = 10  # approximate number of key settings
+    
+    if settings:
+        key_fields = ["description", "website", "facility_address", "training_days", "training_time"]
+        settings_filled = sum(1 for field in key_fields if settings.get(field))
+    
+    settings_completion = (settings_filled / total_settings * 100)
+    
+    operational_metrics = OperationalMetrics(
+        capacity_utilization={"players": round(player_capacity, 1), "coaches": round(coach_capacity, 1)},
+        academy_age=academy_age,
+        settings_completion=round(settings_completion, 1),
+        recent_activity={"players_updated": recent_player_additions, "coaches_updated": recent_coach_additions}
+    )
+    
+    # Calculate summary metrics
+    total_members = total_players + total_coaches
+    monthly_growth_rate = ((recent_player_additions + recent_coach_additions) / max(total_members, 1)) * 100
+    capacity_usage = (player_capacity + coach_capacity) / 2
+    
+    return AcademyAnalytics(
+        academy_id=academy_id,
+        academy_name=academy_name,
+        player_analytics=player_analytics,
+        coach_analytics=coach_analytics,
+        growth_metrics=growth_metrics,
+        operational_metrics=operational_metrics,
+        total_members=total_members,
+        monthly_growth_rate=round(monthly_growth_rate, 1),
+        capacity_usage=round(capacity_usage, 1)
+    )
+
 # Get player-specific analytics (Academy User)
 @api_router.get("/academy/analytics/players", response_model=PlayerAnalytics)
 async def get_player_analytics(user_info = Depends(require_academy_user)):
@@ -2946,8 +5238,8 @@ async def get_player_analytics(user_info = Depends(require_academy_user)):
     try:
         academy_id = user_info["academy_id"]
         
-        # Get comprehensive analytics and return just player analytics
-        analytics = await get_academy_analytics(user_info)
+        # Slice the cached academy analytics
+        analytics = await get_cached_academy_analytics(user_info)
         return analytics.player_analytics
         
     except HTTPException:
@@ -2963,8 +5255,8 @@ async def get_coach_analytics(user_info = Depends(require_academy_user)):
     try:
         academy_id = user_info["academy_id"]
         
-        # Get comprehensive analytics and return just coach analytics
-        analytics = await get_academy_analytics(user_info)
+        # Slice the cached academy analytics
+        analytics = await get_cached_academy_analytics(user_info)
         return analytics.coach_analytics
         
     except HTTPException:
@@ -2980,7 +5272,7 @@ async def get_coach_analytics(user_info = Depends(require_academy_user)):
 async def player_login(request: PlayerSignInRequest):
     """Player login endpoint"""
     try:
-        response = supabase.auth.sign_in_with_password({
+        response = await supabase_gateway.call(supabase.auth.sign_in_with_password, {
             "email": request.email,
             "password": request.password
         })
@@ -3068,23 +5360,29 @@ async def change_player_password(request: PlayerPasswordChangeRequest, user_info
     try:
         # Verify current password by attempting to sign in
         try:
-            supabase.auth.sign_in_with_password({
+            await supabase_gateway.call(supabase.auth.sign_in_with_password, {
                 "email": user_info["user"].email,
                 "password": request.current_password
             })
+        except asyncio.TimeoutError:
+            raise
         except:
             raise HTTPException(status_code=400, detail="Current password is incorrect")
         
-        # Update password in Supabase
-        supabase.auth.update_user({
-            "password": request.new_password
-        })
+        # Update password in Supabase by user id; the shared anon client's
+        # session belongs to whichever request signed in last
+        await supabase_gateway.call(
+            supabase_admin.auth.admin.update_user_by_id,
+            user_info["user"].id,
+            {"password": request.new_password}
+        )
         
         # Mark password as changed in database
         await db.players.update_one(
             {"id": user_info["player_id"]},
             {"$set": {"password_changed": True, "updated_at": datetime.utcnow()}}
         )
+        invalidate_identity(user_info["user"].id)
         
         return {"message": "Password changed successfully"}
         
@@ -3104,9 +5402,7 @@ async def get_player_attendance_history(user_info = Depends(require_player_user)
         player_id = user_info["player_id"]
         
         # Get attendance records for this player
-        attendance_records_raw = await db.player_attendance.find(
-            {"player_id": player_id}
-        ).sort("date", -1).limit(100).to_list(100)
+        attendance_records_raw = await latest_attendance_records({"player_id": player_id}, 100, {"_id": 0})
         
         # Clean attendance records for JSON serialization
         attendance_records = []
@@ -3118,7 +5414,7 @@ async def get_player_attendance_history(user_info = Depends(require_player_user)
                 "date": record.get("date"),
                 "present": record.get("present"),
                 "sport": record.get("sport"),
-                "performance_ratings": record.get("performance_ratings", {}),
+                "performance_ratings": decode_performance_ratings(record),
                 "notes": record.get("notes"),
                 "marked_by": record.get("marked_by"),
                 "created_at": record.get("created_at").isoformat() if record.get("created_at") else None
@@ -3152,35 +5448,35 @@ async def get_player_performance_stats(user_info = Depends(require_player_user))
         player_id = user_info["player_id"]
         player = user_info["player"]
         
-        # Get performance data from attendance records
-        attendance_records = await db.player_attendance.find(
-            {"player_id": player_id, "present": True}
-        ).sort("date", -1).to_list(100)
+        # Averages come from the maintained rollup; only the trend reads attendance
+        stats, recent_records = await asyncio.gather(
+            get_player_stats(player_id, player["academy_id"]),
+            latest_attendance_records(
+                {"player_id": player_id, "present": True},
+                10,
+                {"_id": 0, "date": 1, **{f: 1 for f in RATINGS_FIELDS}}
+            )
+        )
         
         # Calculate performance averages
         category_averages = {}
         performance_trend = []
         
-        if attendance_records:
+        if stats.get("attended_sessions"):
             # Get performance categories for this player's sport
             sport_categories = get_sport_performance_categories(player.get("sport", "Other"))
+            category_totals = stats.get("categories", {})
             
             # Calculate averages for each category
             for category in sport_categories:
-                ratings = []
-                for record in attendance_records:
-                    rating = record.get("performance_ratings", {}).get(category)
-                    if rating is not None:
-                        ratings.append(rating)
-                
-                if ratings:
-                    category_averages[category] = round(sum(ratings) / len(ratings), 2)
+                totals = category_totals.get(category, {})
+                if totals.get("count"):
+                    category_averages[category] = round(totals["sum"] / totals["count"], 2)
                 else:
                     category_averages[category] = 0
             
-            # Build performance trend (last 30 days)
-            recent_records = attendance_records[:30]
-            for record in recent_records:
+            # Build performance trend (last 10 sessions)
+            for record in map(decode_attendance_document, recent_records):
                 performance_trend.append({
                     "date": record.get("date"),
                     "overall_rating": sum(record.get("performance_ratings", {}).values()) / len(record.get("performance_ratings", {})) if record.get("performance_ratings") else 0,
@@ -3194,10 +5490,10 @@ async def get_player_performance_stats(user_info = Depends(require_player_user))
             "player_name": f"{player.get('first_name', '')} {player.get('last_name', '')}",
             "sport": player.get("sport"),
             "position": player.get("position"),
-            "total_sessions": len(attendance_records),
+            "total_sessions": stats.get("attended_sessions", 0),
             "category_averages": category_averages,
             "overall_average_rating": round(overall_average, 2),
-            "performance_trend": performance_trend[:10]  # Last 10 sessions
+            "performance_trend": performance_trend
         }
         
     except Exception as e:
@@ -3294,17 +5590,34 @@ async def update_theme_preference(theme: str):
 
 # Get Academy Announcements (Academy User)
 @api_router.get("/academy/announcements")
-async def get_academy_announcements(user_info = Depends(require_academy_user)):
-    """Get all announcements for the academy"""
+async def get_academy_announcements(
+    response: Response,
+    is_active: Optional[bool] = None,
+    priority: Optional[str] = None,
+    target_audience: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[str] = None,
+    user_info = Depends(require_academy_user)
+):
+    """Get announcements for the academy, newest first, one keyset page at a time"""
     try:
         academy_id = user_info["academy_id"]
         
-        announcements = await db.announcements.find(
-            {"academy_id": academy_id}
-        ).sort("created_at", -1).to_list(100)
+        announcements, next_cursor = await paginate(
+            db.announcements,
+            without_none(
+                academy_id=academy_id, is_active=is_active,
+                priority=priority, target_audience=target_audience
+            ),
+            limit, after, descending=True, projection={"_id": 0}
+        )
+        if next_cursor:
+            response.headers[NEXT_CURSOR_HEADER] = next_cursor
         
-        return {"announcements": announcements}
+        return {"announcements": announcements, "next_cursor": next_cursor}
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error fetching academy announcements: {e}")
         raise HTTPException(status_code=500, detail="Failed to fetch announcements")
@@ -3338,28 +5651,14 @@ async def update_academy_announcement(announcement_id: str, announcement_data: A
     try:
         academy_id = user_info["academy_id"]
         
-        # Check if announcement exists
-        existing_announcement = await db.announcements.find_one({
-            "id": announcement_id,
-            "academy_id": academy_id
-        })
-        if not existing_announcement:
-            raise HTTPException(status_code=404, detail="Announcement not found")
-        
-        # Update announcement
+        # Update announcement and return the result
         update_data = announcement_data.dict(exclude_unset=True)
         if update_data:
             update_data["updated_at"] = datetime.utcnow()
-            await db.announcements.update_one(
-                {"id": announcement_id, "academy_id": academy_id},
-                {"$set": update_data}
-            )
-        
-        # Get updated announcement
-        updated_announcement = await db.announcements.find_one({
-            "id": announcement_id,
-            "academy_id": academy_id
-        })
+        updated_announcement = await update_scoped_document(
+            db.announcements, announcement_id, update_data, "Announcement not found",
+            academy_id=academy_id
+        )
         return Announcement(**updated_announcement)
         
     except HTTPException:
@@ -3412,11 +5711,120 @@ app.add_middleware(
     allow_origin_regex=r"https://.*\.vercel\.app$",
     allow_methods=["*"],
     allow_headers=["*"],
-    expose_headers=["Content-Length", "X-Requested-With"],
+    expose_headers=["Content-Length", "X-Requested-With", "ETag", NEXT_CURSOR_HEADER],
     max_age=600,
 )
 
 
+@app.on_event("startup")
+async def bootstrap_database():
+    global deletion_jobs_wakeup
+    if os.getenv("ENSURE_INDEXES_ON_STARTUP", "true").lower() == "true":
+        failed = await ensure_indexes()
+        if failed:
+            logger.warning(f"Index bootstrap finished with failures: {', '.join(failed)}")
+    else:
+        await ensure_activity_log()
+    await check_registration_index()
+    if ATTENDANCE_ARCHIVE_INTERVAL_SECONDS > 0:
+        app.state.attendance_archiver = asyncio.create_task(run_attendance_archiver())
+    if DELETION_WORKER_ENABLED:
+        deletion_jobs_wakeup = asyncio.Event()
+        app.state.deletion_worker = asyncio.create_task(run_deletion_worker())
+
 @app.on_event("shutdown")
 async def shutdown_db_client():
+    for task_name in ("attendance_archiver", "deletion_worker"):
+        task = getattr(app.state, task_name, None)
+        if task:
+            task.cancel()
     client.close()
+    supabase_gateway.shutdown()
+
+
+# ========== MAINTENANCE COMMANDS ==========
+
+async def _command_ensure_indexes(args):
+    failed = await ensure_indexes()
+    print("All registered indexes are in place" if not failed else f"Failed: {', '.join(failed)}")
+
+async def _command_index_report(args):
+    report = await build_index_report()
+    for collection_name, entry in report.items():
+        print(f"{collection_name}:")
+        for kind in ("missing", "unused", "undeclared"):
+            print(f"  {kind}: {', '.join(entry[kind]) or '-'}")
+
+async def _command_reconcile_counters(args):
+    written = await reconcile_academy_counters(args.academy_id)
+    print(f"Reconciled member counters for {written} academies")
+
+async def _command_rebuild_player_stats(args):
+    written = await rebuild_player_stats(player_id=args.player_id, academy_id=args.academy_id)
+    print(f"Rebuilt performance rollups for {written} players")
+
+async def _command_migrate_performance_ratings(args):
+    converted = await migrate_performance_ratings(args.academy_id)
+    print(f"Converted performance ratings of {converted} attendance records")
+
+async def _command_migrate_attendance_layout(args):
+    copied = await migrate_attendance_layout(args.to)
+    print(f"Copied {copied} attendance records into the {args.to} layout; set ATTENDANCE_STORAGE={args.to} and restart")
+
+async def _command_archive_attendance(args):
+    archived = await archive_attendance(args.before_month, args.academy_id)
+    print(f"Archived {archived} attendance records ({ARCHIVE_CODEC})")
+
+async def _command_run_deletion_jobs(args):
+    ran = await run_pending_deletion_jobs()
+    print(f"Ran {ran} deletion jobs")
+
+async def _command_rebuild_attendance_monthly(args):
+    written = await rebuild_attendance_monthly(args.academy_id)
+    print(f"Rebuilt {written} monthly attendance rows")
+
+# command name -> (handler, help, [(flags, argparse kwargs), ...])
+MAINTENANCE_COMMANDS = {
+    "ensure-indexes": (_command_ensure_indexes, "Create every registered MongoDB index", []),
+    "index-report": (_command_index_report, "Report missing, unused and undeclared indexes", []),
+    "reconcile-counters": (_command_reconcile_counters, "Recompute academy member counters from source", [
+        (["--academy-id"], {"help": "Only reconcile this academy"}),
+    ]),
+    "rebuild-player-stats": (_command_rebuild_player_stats, "Rebuild per-player performance rollups from attendance", [
+        (["--academy-id"], {"help": "Only rebuild players of this academy"}),
+        (["--player-id"], {"help": "Only rebuild this player"}),
+    ]),
+    "rebuild-attendance-monthly": (_command_rebuild_attendance_monthly, "Backfill the monthly attendance rollup", [
+        (["--academy-id"], {"help": "Only rebuild this academy (summaries keep reading attendance until a full run)"}),
+    ]),
+    "migrate-performance-ratings": (_command_migrate_performance_ratings, "Store attendance ratings in the columnar layout", [
+        (["--academy-id"], {"help": "Only migrate this academy"}),
+    ]),
+    "migrate-attendance-layout": (_command_migrate_attendance_layout, "Copy attendance into another storage layout", [
+        (["--to"], {"required": True, "choices": ["documents", "buckets"], "help": "Target layout"}),
+    ]),
+    "run-deletion-jobs": (_command_run_deletion_jobs, "Run pending player/academy deletion jobs to completion", []),
+    "archive-attendance": (_command_archive_attendance, "Move old attendance months into the compressed archive", [
+        (["--before-month"], {"help": "Archive months before this one (YYYY-MM); defaults to ATTENDANCE_ARCHIVE_AFTER_DAYS"}),
+        (["--academy-id"], {"help": "Only archive this academy"}),
+    ]),
+}
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Track My Academy backend maintenance commands")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    for command_name, (_, command_help, command_arguments) in MAINTENANCE_COMMANDS.items():
+        subparser = subparsers.add_parser(command_name, help=command_help)
+        for flags, kwargs in command_arguments:
+            subparser.add_argument(*flags, **kwargs)
+    args = parser.parse_args()
+
+    async def _run_command():
+        try:
+            await MAINTENANCE_COMMANDS[args.command][0](args)
+        finally:
+            client.close()
+
+    asyncio.run(_run_command())
@@ -82,7 +82,7 @@ const AttendanceTracker = () => {
 
     try {
       const response = await fetch(`${API_BASE_URL}/api/academy/attendance/${date}`, {
-          method: 'POST',
+          method: 'GET',
           headers: {
           'Authorization': `Bearer ${token}`,
           'Content-Type': 'application/json'
@@ -0,0 +1,15 @@
+import os
+import sys
+from pathlib import Path
+
+# server.py reads its connection settings at import time; the helpers under
+# test never reach MongoDB or Supabase, so placeholders are enough
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "track_my_academy_test")
+os.environ.setdefault("SUPABASE_URL", "https://test.supabase.co")
+os.environ.setdefault("SUPABASE_KEY", "eyJhbGciOiJIUzI1NiJ9.eyJyb2xlIjoiYW5vbiJ9.test")
+os.environ.setdefault("SUPABASE_SERVICE_KEY", "eyJhbGciOiJIUzI1NiJ9.eyJyb2xlIjoic2VydmljZV9yb2xlIn0.test")
+os.environ.setdefault("ENSURE_INDEXES_ON_STARTUP", "false")
+os.environ.setdefault("DELETION_WORKER_ENABLED", "false")
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
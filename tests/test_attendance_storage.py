@@ -0,0 +1,114 @@
+import asyncio
+from datetime import datetime
+
+import pytest
+
+from server import BucketedAttendanceStorage, DocumentAttendanceStorage, merge_archived_records
+
+month_condition = BucketedAttendanceStorage._month_condition
+
+
+@pytest.mark.parametrize("condition, expected", [
+    ("2024-03-05", "2024-03"),
+    ({"$eq": "2024-03-05"}, {"$eq": "2024-03"}),
+    ({"$gte": "2024-01-15", "$lt": "2024-03-01"}, {"$gte": "2024-01", "$lte": "2024-03"}),
+    ({"$gt": "2024-01-31", "$lte": "2024-02-29"}, {"$gte": "2024-01", "$lte": "2024-02"}),
+    ({"$in": ["2024-02-01", "2024-01-31", "2024-02-15"]}, {"$in": ["2024-01", "2024-02"]}),
+])
+def test_month_condition_widens_date_conditions(condition, expected):
+    assert month_condition(condition) == expected
+
+
+@pytest.mark.parametrize("condition", [
+    {"$ne": "2024-01-01"},
+    {"$nin": ["2024-01-01"]},
+    {"$exists": True},
+    None,
+])
+def test_month_condition_leaves_out_what_it_cannot_widen(condition):
+    assert month_condition(condition) is None
+
+
+def test_month_condition_keeps_the_operators_it_can_widen():
+    assert month_condition({"$gte": "2024-01-15", "$ne": "2024-01-20"}) == {"$gte": "2024-01"}
+
+
+def test_bucket_match():
+    storage = BucketedAttendanceStorage(None)
+    assert storage._bucket_match({"academy_id": "a1", "player_id": "p1", "date": "2024-01-05", "present": True}) == {
+        "academy_id": "a1", "player_id": "p1", "month": "2024-01"
+    }
+    # No {"month": {}} that would match no bucket; the record $match does the filtering
+    assert storage._bucket_match({"academy_id": "a1", "date": {"$ne": "2024-01-05"}}) == {"academy_id": "a1"}
+
+
+def test_document_write_operation_guards_on_updated_at():
+    storage = DocumentAttendanceStorage(None)
+    now = datetime(2024, 1, 5, 12)
+    created = storage.write_operation("a1", "p1", "2024-01-05", {"present": True}, None, now)
+    assert created._doc["player_id"] == "p1" and created._doc["created_at"] == now
+
+    previous_at = datetime(2024, 1, 5, 9)
+    updated = storage.write_operation("a1", "p1", "2024-01-05", {"present": False}, {"updated_at": previous_at}, now)
+    assert updated._filter == {"player_id": "p1", "academy_id": "a1", "date": "2024-01-05", "updated_at": previous_at}
+    assert updated._upsert is True
+
+    legacy = storage.write_operation("a1", "p1", "2024-01-05", {"present": False}, {"date": "2024-01-05"}, now)
+    assert legacy._filter["updated_at"] == {"$exists": False}
+
+
+def test_bucket_write_operation_guards_on_updated_at():
+    storage = BucketedAttendanceStorage(None)
+    now = datetime(2024, 1, 5, 12)
+    pushed = storage.write_operation("a1", "p1", "2024-01-05", {"present": True}, None, now)
+    assert pushed._filter == {"academy_id": "a1", "player_id": "p1", "month": "2024-01", "records.date": {"$ne": "2024-01-05"}}
+
+    previous_at = datetime(2024, 1, 5, 9)
+    updated = storage.write_operation("a1", "p1", "2024-01-05", {"present": False}, {"updated_at": previous_at}, now)
+    assert updated._filter == {
+        "academy_id": "a1", "player_id": "p1", "month": "2024-01",
+        "records": {"$elemMatch": {"date": "2024-01-05", "updated_at": previous_at}},
+    }
+
+
+async def _stream(records):
+    for record in records:
+        yield record
+
+
+def _merge(live, archived):
+    async def collect():
+        return [record async for record in merge_archived_records(_stream(live), _stream(archived))]
+    return asyncio.run(collect())
+
+
+def test_merge_interleaves_by_date_then_player():
+    live = [{"date": "2024-01-02", "player_id": "p1"}, {"date": "2024-01-03", "player_id": "p2"}]
+    archived = [
+        {"date": "2024-01-01", "player_id": "p9"},
+        {"date": "2024-01-02", "player_id": "p0"},
+        {"date": "2024-01-03", "player_id": "p3"},
+    ]
+    assert [(r["date"], r["player_id"]) for r in _merge(live, archived)] == [
+        ("2024-01-01", "p9"),
+        ("2024-01-02", "p0"),
+        ("2024-01-02", "p1"),
+        ("2024-01-03", "p2"),
+        ("2024-01-03", "p3"),
+    ]
+
+
+def test_merge_prefers_live_records_on_ties():
+    live = [{"date": "2024-01-02", "player_id": "p1", "source": "live"}]
+    archived = [
+        {"date": "2024-01-02", "player_id": "p1", "source": "archive"},
+        {"date": "2024-01-02", "player_id": "p2", "source": "archive"},
+    ]
+    assert [(r["player_id"], r["source"]) for r in _merge(live, archived)] == [("p1", "live"), ("p2", "archive")]
+
+
+def test_merge_with_one_side_empty():
+    records = [{"date": "2024-01-01", "player_id": "p1"}, {"date": "2024-01-02", "player_id": "p1"}]
+    assert _merge([], records) == records
+    assert _merge(records, []) == records
+    assert _merge([], []) == []
@@ -0,0 +1,113 @@
+import pytest
+
+import server
+from server import _edge_bounds, _merge_summary_facets, _shift_month, _split_summary_range
+
+
+@pytest.mark.parametrize("month, delta, expected", [
+    ("2024-05", 1, "2024-06"),
+    ("2024-12", 1, "2025-01"),
+    ("2024-01", -1, "2023-12"),
+    ("2024-03", -14, "2023-01"),
+])
+def test_shift_month(month, delta, expected):
+    assert _shift_month(month, delta) == expected
+
+
+def test_split_whole_months_has_no_edges():
+    assert _split_summary_range("2024-01-01", "2024-03-31") == ({"$gte": "2024-01", "$lte": "2024-03"}, [])
+
+
+def test_split_partial_months_become_edges():
+    month_range, edge_ranges = _split_summary_range("2024-01-15", "2024-03-10")
+    assert month_range == {"$gte": "2024-02", "$lte": "2024-02"}
+    assert edge_ranges == [
+        {"$gte": "2024-01-15", "$lt": "2024-02"},
+        {"$gte": "2024-03", "$lte": "2024-03-10"},
+    ]
+
+
+@pytest.mark.parametrize("end_date, last_month", [
+    ("2024-02-29", "2024-02"),  # Leap year
+    ("2023-02-28", "2023-02"),
+    ("2024-02-28", "2024-01"),
+    ("2024-12-31", "2024-12"),
+])
+def test_split_month_end_detection(end_date, last_month):
+    month_range, _ = _split_summary_range("2023-01-01", end_date)
+    assert month_range["$lte"] == last_month
+
+
+def test_split_start_in_december_rolls_over_the_year():
+    month_range, edge_ranges = _split_summary_range("2023-12-15", "2024-02-29")
+    assert month_range == {"$gte": "2024-01", "$lte": "2024-02"}
+    assert edge_ranges == [{"$gte": "2023-12-15", "$lt": "2024-01"}]
+
+
+def test_split_open_ended_ranges():
+    assert _split_summary_range(None, None) == ({}, [])
+    assert _split_summary_range("2024-01-01", None) == ({"$gte": "2024-01"}, [])
+    assert _split_summary_range(None, "2024-01-31") == ({"$lte": "2024-01"}, [])
+
+
+@pytest.mark.parametrize("start_date, end_date", [
+    ("2024-01-05", "2024-01-20"),  # Inside a single month
+    ("2024-01-15", "2024-02-10"),  # Two partial months
+    ("2024-1-5", "2024-03-31"),    # Not zero padded
+    ("2024-13-01", "2024-14-30"),  # Not a date
+])
+def test_split_without_whole_months(start_date, end_date):
+    assert _split_summary_range(start_date, end_date) is None
+
+
+@pytest.mark.parametrize("edge_range, bounds", [
+    ({"$gte": "2024-01-15", "$lt": "2024-02"}, ("2024-01-15", "2024-01-31")),
+    ({"$gte": "2024-02-03", "$lt": "2024-03"}, ("2024-02-03", "2024-02-29")),
+    ({"$gte": "2023-12-15", "$lt": "2024-01"}, ("2023-12-15", "2023-12-31")),
+    ({"$gte": "2024-03", "$lte": "2024-03-10"}, ("2024-03", "2024-03-10")),
+])
+def test_edge_bounds(edge_range, bounds):
+    assert _edge_bounds(edge_range) == bounds
+
+
+def test_merge_summary_facets_adds_counts_by_id():
+    live = {
+        "totals": [{"_id": None, "total_records": 3, "present_records": 2, "rating_sum": 7.5, "rating_count": 2}],
+        "by_player": [{"_id": "p1", "total_records": 3, "present_records": 2, "player": [{"first_name": "Ana"}]}],
+    }
+    archived = {
+        "totals": [{"_id": None, "total_records": 1, "present_records": 1, "rating_sum": 4, "rating_count": 1}],
+        "by_player": [
+            {"_id": "p1", "total_records": 1, "present_records": 1, "player": [{"first_name": "Stale"}]},
+            {"_id": "p0", "total_records": 1, "present_records": 0, "player": []},
+        ],
+    }
+    merged = _merge_summary_facets(live, archived)
+    assert merged["totals"] == [
+        {"_id": None, "total_records": 4, "present_records": 3, "rating_sum": 11.5, "rating_count": 3}
+    ]
+    # Sorted by _id; the first result's non-count fields are kept
+    assert merged["by_player"] == [
+        {"_id": "p0", "total_records": 1, "present_records": 0, "player": []},
+        {"_id": "p1", "total_records": 4, "present_records": 3, "player": [{"first_name": "Ana"}]},
+    ]
+
+
+def test_attendance_monthly_contribution_averages_session_ratings():
+    record = {
+        "date": "2024-01-05",
+        "present": True,
+        "sport": "Football",
+        **server.encode_performance_ratings("Football", {"Technical Skills": 4, "Teamwork": 2}),
+    }
+    assert server.attendance_monthly_contribution(record) == {
+        "total_records": 1,
+        "present_records": 1,
+        "rating_sum": 3,
+        "rating_count": 1,
+        "categories.Technical Skills.sum": 4,
+        "categories.Technical Skills.count": 1,
+        "categories.Teamwork.sum": 2,
+        "categories.Teamwork.count": 1,
+    }
+    assert server.attendance_monthly_contribution({**record, "present": False}, sign=-1) == {"total_records": -1}
@@ -0,0 +1,98 @@
+import asyncio
+from datetime import datetime
+
+import pytest
+from fastapi import HTTPException
+
+from server import ASCENDING, DESCENDING, decode_cursor, encode_cursor, paginate
+
+
+class FakeCursor:
+    def __init__(self, documents):
+        self.documents = documents
+        self.sort_spec = None
+        self.limit_value = None
+
+    def sort(self, spec):
+        self.sort_spec = spec
+        return self
+
+    def limit(self, limit):
+        self.limit_value = limit
+        return self
+
+    async def to_list(self, length):
+        return self.documents[:length] if length is not None else list(self.documents)
+
+
+class FakeCollection:
+    """Returns the given documents for any find and remembers the last query"""
+
+    def __init__(self, documents):
+        self.documents = documents
+        self.query = None
+        self.cursor = None
+
+    def find(self, query, projection=None):
+        self.query = query
+        self.cursor = FakeCursor(self.documents)
+        return self.cursor
+
+
+def test_cursor_round_trip():
+    created_at = datetime(2024, 1, 5, 12, 30, 15, 250000)
+    assert decode_cursor(encode_cursor({"created_at": created_at, "id": "b"})) == (created_at, "b")
+    assert decode_cursor(encode_cursor({"timestamp": "2024-01-05", "id": "c"}, "timestamp")) == (
+        datetime(2024, 1, 5), "c"
+    )
+
+
+@pytest.mark.parametrize("cursor", ["not-a-cursor", "", "W10"])
+def test_invalid_cursor_is_a_400(cursor):
+    with pytest.raises(HTTPException) as error:
+        decode_cursor(cursor)
+    assert error.value.status_code == 400
+
+
+def test_unpaged_returns_everything_without_a_cursor():
+    documents = [{"id": str(i)} for i in range(5)]
+    collection = FakeCollection(documents)
+    page, next_cursor = asyncio.run(paginate(collection, {"academy_id": "a1"}, None))
+    assert page == documents and next_cursor is None
+    assert collection.query == {"academy_id": "a1"}
+    assert collection.cursor.sort_spec == [("created_at", ASCENDING), ("id", ASCENDING)]
+
+
+def test_paged_skips_rows_without_sort_keys_and_returns_a_cursor():
+    created_at = datetime(2024, 1, 1)
+    documents = [{"created_at": created_at, "id": id_} for id_ in ("a", "b", "c")]
+    collection = FakeCollection(documents)
+    page, next_cursor = asyncio.run(paginate(collection, {"academy_id": "a1"}, 2))
+    assert page == documents[:2]
+    assert collection.query == {"$and": [{"academy_id": "a1"}, {"created_at": {"$ne": None}, "id": {"$ne": None}}]}
+    assert collection.cursor.limit_value == 3
+    assert decode_cursor(next_cursor) == (created_at, "b")
+
+
+def test_last_page_has_no_cursor():
+    documents = [{"created_at": datetime(2024, 1, 1), "id": "a"}]
+    page, next_cursor = asyncio.run(paginate(FakeCollection(documents), {}, 2))
+    assert page == documents and next_cursor is None
+
+
+def test_cursor_breaks_created_at_ties_on_id():
+    created_at = datetime(2024, 1, 1)
+    collection = FakeCollection([])
+    asyncio.run(paginate(collection, {"academy_id": "a1"}, 2, encode_cursor({"created_at": created_at, "id": "b"})))
+    assert collection.query["$and"][-1] == {"$or": [
+        {"created_at": {"$gt": created_at}},
+        {"created_at": created_at, "id": {"$gt": "b"}},
+    ]}
+
+
+def test_descending_cursor():
+    collection = FakeCollection([])
+    after = encode_cursor({"timestamp": datetime(2024, 1, 1), "id": "b"}, "timestamp")
+    asyncio.run(paginate(collection, {}, 2, after, sort_field="timestamp", descending=True))
+    assert collection.query["$and"][-1]["$or"][1] == {"timestamp": datetime(2024, 1, 1), "id": {"$lt": "b"}}
+    assert collection.cursor.sort_spec == [("timestamp", DESCENDING), ("id", DESCENDING)]
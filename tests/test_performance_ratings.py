@@ -0,0 +1,62 @@
+from server import (
+    RATINGS_SCHEMA_VERSION,
+    SPORT_PERFORMANCE_CATEGORIES,
+    decode_attendance_document,
+    decode_performance_ratings,
+    encode_performance_ratings,
+)
+
+
+def test_encode_aligns_ratings_to_sport_categories():
+    encoded = encode_performance_ratings("Football", {"Technical Skills": 4, "Teamwork": 5, "overall": 3})
+    assert encoded == {
+        "performance_ratings": [4, None, None, None, 5],
+        "performance_ratings_extra": {"overall": 3},
+        "ratings_schema": RATINGS_SCHEMA_VERSION,
+    }
+
+
+def test_encode_trims_trailing_gaps_and_drops_empty_extras():
+    encoded = encode_performance_ratings("Football", {"Technical Skills": 4, "Teamwork": None, "overall": None})
+    assert encoded["performance_ratings"] == [4]
+    assert encoded["performance_ratings_extra"] == {}
+
+
+def test_encode_without_ratings():
+    assert encode_performance_ratings("Football", None) == {
+        "performance_ratings": [],
+        "performance_ratings_extra": {},
+        "ratings_schema": RATINGS_SCHEMA_VERSION,
+    }
+
+
+def test_schema_1_round_trip():
+    ratings = {"Technical Skills": 4, "Physical Fitness": 1, "Teamwork": 5, "overall": 3, "Leadership": 2}
+    document = {"sport": "Football", **encode_performance_ratings("Football", ratings)}
+    assert decode_performance_ratings(document) == ratings
+
+
+def test_round_trip_drops_missing_ratings():
+    document = {"sport": "Cricket", **encode_performance_ratings("Cricket", {"Teamwork": None, "Mental Strength": 2})}
+    assert decode_performance_ratings(document) == {"Mental Strength": 2}
+
+
+def test_unknown_sport_uses_the_other_categories():
+    category = SPORT_PERFORMANCE_CATEGORIES["Other"][0]
+    document = {"sport": "Curling", **encode_performance_ratings("Curling", {category: 3})}
+    assert document["performance_ratings"] == [3]
+    assert decode_performance_ratings(document) == {category: 3}
+
+
+def test_decode_legacy_dict_documents():
+    assert decode_performance_ratings({"performance_ratings": {"Speed": 4}}) == {"Speed": 4}
+    assert decode_performance_ratings({}) == {}
+
+
+def test_decode_attendance_document_replaces_stored_fields():
+    document = {"id": "r1", "sport": "Football", **encode_performance_ratings("Football", {"Teamwork": 5, "overall": 3})}
+    assert decode_attendance_document(document) == {
+        "id": "r1",
+        "sport": "Football",
+        "performance_ratings": {"Teamwork": 5, "overall": 3},
+    }